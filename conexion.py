@@ -0,0 +1,332 @@
+''''
+    Gestor de Conexión Compartido para RabbitMQ
+
+    Este módulo centraliza la conexión con RabbitMQ que usan el productor, el consumidor
+    y los visualizadores. Declara la topología completa en un solo lugar y se reconecta
+    automáticamente cuando el broker se reinicia o la red se interrumpe.
+    ------------------------------------------------
+        * Declara exchanges, colas y bindings de forma idempotente en cada (re)conexión.
+        * Reintenta la conexión con backoff exponencial con jitter.
+        * Usa heartbeats para detectar conexiones caídas.
+        * Reanuda el consumo de la cola tras una reconexión.
+        * Reenvía las publicaciones que no alcanzaron a ser confirmadas por el broker.
+        * Los errores permanentes (credenciales, permisos, topología incompatible) y el
+          agotamiento de `intentos_maximos` se propagan en lugar de reintentarse.
+    ------------------------------------------------
+'''
+
+import pika
+import time
+import random
+import socket
+from collections import deque
+
+# Constantes para RabbitMQ (compartidas por productor, consumidor y visualizadores)
+RABBITMQ_HOST = 'localhost'
+RABBITMQ_PUERTO = 5672
+RABBITMQ_USUARIO = 'guest'
+RABBITMQ_PASSWORD = 'guest'
+EXCHANGE_NAME = 'simulacion_exchange' # Único exchange para la simulación
+
+# Cola y routing key para los escenarios
+ESCENARIOS_QUEUE_NAME = 'escenarios_queue'
+ESCENARIOS_ROUTING_KEY = 'escenario.nuevo'
+
+# Cola y routing key para los resultados
+RESULTADOS_QUEUE_NAME = 'resultados_queue'
+RESULTADOS_ROUTING_KEY = 'resultado.procesado'
+
+# Exchange fanout sin routing key para el dashboard
+DASHBOARD_EXCHANGE = 'dashboard_exchange'
+
+# Parámetros de reconexión
+HEARTBEAT = 30 # Segundos entre latidos para detectar conexiones caídas
+BLOCKED_CONNECTION_TIMEOUT = 300 # Tiempo máximo que una conexión puede estar bloqueada por el broker
+ESPERA_INICIAL = 0.5 # Espera base (segundos) del backoff
+ESPERA_MAXIMA = 30.0 # Tope de la espera (segundos) del backoff
+
+# Errores que indican que la conexión o el canal se perdieron y vale la pena reconectar
+ERRORES_CONEXION = (
+    pika.exceptions.AMQPConnectionError,
+    pika.exceptions.AMQPChannelError,
+    pika.exceptions.ConnectionWrongStateError,
+    pika.exceptions.ChannelWrongStateError,
+)
+
+# Errores permanentes: reconectar no los resuelve (credenciales o permisos inválidos, y canales
+# cerrados por el broker con 403/404/406, p. ej. una cola declarada con otros argumentos)
+ERRORES_FATALES = (
+    pika.exceptions.ProbableAuthenticationError,
+    pika.exceptions.ProbableAccessDeniedError,
+    pika.exceptions.AuthenticationError,
+    pika.exceptions.ChannelClosedByBroker,
+)
+
+
+class ConexionAgotada(pika.exceptions.AMQPConnectionError):
+    """Se agotaron los intentos de conexión indicados en `intentos_maximos`."""
+
+
+def es_error_fatal(error):
+    """Indica si un error de conexión no se debe reintentar."""
+    if isinstance(error, ERRORES_FATALES + (ConexionAgotada,)):
+        return True
+    # El broker rechaza el acceso (p. ej. usuario sin permisos sobre el vhost) cerrando la conexión con 403
+    return isinstance(error, pika.exceptions.ConnectionClosedByBroker) and error.reply_code == 403
+
+
+def declarar_topologia(channel):
+    """
+    Declara todos los exchanges, colas y bindings de la simulación.
+    Todas las declaraciones son idempotentes, por lo que se puede llamar en cada reconexión.
+    """
+    # Exchange directo principal y exchange fanout para el dashboard
+    channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='direct', durable=True)
+    channel.exchange_declare(exchange=DASHBOARD_EXCHANGE, exchange_type='fanout', durable=True)
+
+    # Cola de escenarios (productor -> consumidores)
+    channel.queue_declare(queue=ESCENARIOS_QUEUE_NAME, durable=True)
+    channel.queue_bind(exchange=EXCHANGE_NAME, queue=ESCENARIOS_QUEUE_NAME, routing_key=ESCENARIOS_ROUTING_KEY)
+
+    # Cola de resultados (consumidores -> visualizador)
+    channel.queue_declare(queue=RESULTADOS_QUEUE_NAME, durable=True)
+    channel.queue_bind(exchange=EXCHANGE_NAME, queue=RESULTADOS_QUEUE_NAME, routing_key=RESULTADOS_ROUTING_KEY)
+
+
+def esperar_broker(host=RABBITMQ_HOST, puerto=RABBITMQ_PUERTO, timeout=30.0):
+    """
+    Espera a que el puerto AMQP del broker acepte conexiones, en lugar de dormir un tiempo fijo.
+    Regresa True en cuanto el broker está listo, o False si se agota el tiempo de espera.
+    """
+    limite = time.monotonic() + timeout
+    espera = 0.05
+    while True:
+        try:
+            with socket.create_connection((host, puerto), timeout=1.0):
+                return True
+        except OSError:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            time.sleep(min(espera, restante))
+            espera = min(espera * 2, 1.0)
+
+
+class ConexionRabbitMQ:
+    """
+    Conexión a RabbitMQ con reconexión automática.
+
+    Mantiene una única conexión bloqueante y un canal. Si la conexión se pierde durante
+    una publicación o mientras se consume, se reconecta con backoff exponencial con jitter,
+    vuelve a declarar la topología, reenvía las publicaciones no confirmadas y reanuda el consumo.
+    Los errores permanentes (ver `es_error_fatal`) se propagan de inmediato, y al agotarse
+    `intentos_maximos` se lanza `ConexionAgotada`, tanto en `conectar` como en `publicar` y `consumir`.
+    """
+
+    def __init__(self, host=RABBITMQ_HOST, prefijo="[Conexión RabbitMQ]", confirmar_publicaciones=True,
+                 intentos_maximos=None, heartbeat=HEARTBEAT, puerto=RABBITMQ_PUERTO):
+        self.host = host
+        self.puerto = puerto
+        self.prefijo = prefijo # Prefijo para los mensajes de consola (p. ej. " [C:1234]")
+        self.confirmar_publicaciones = confirmar_publicaciones # Activa publisher confirms en el canal
+        self.intentos_maximos = intentos_maximos # None = reintentar indefinidamente
+        self.heartbeat = heartbeat
+        self.connection = None
+        self.channel = None
+        self.canal_sin_confirmar = None # Canal sin publisher confirms para publicaciones de mejor esfuerzo
+        self.reconexiones = 0 # Número de reconexiones realizadas (sin contar la primera conexión)
+        self._pendientes = deque() # Publicaciones aún no confirmadas por el broker
+        self._conectado_alguna_vez = False
+        self._detener_solicitado = False
+
+    # --- Conexión ---
+    def esta_abierta(self):
+        return (self.connection is not None and self.connection.is_open
+                and self.channel is not None and self.channel.is_open)
+
+    def conectar(self):
+        """
+        Establece la conexión (reintentando con backoff) y declara la topología.
+        Si ya está abierta no hace nada.
+        """
+        if self.esta_abierta():
+            return self.channel
+
+        intento = 0
+        while True:
+            try:
+                self.cerrar()
+                credentials = pika.PlainCredentials(RABBITMQ_USUARIO, RABBITMQ_PASSWORD)
+                connection_parameters = pika.ConnectionParameters(
+                    self.host,
+                    self.puerto,
+                    credentials=credentials,
+                    heartbeat=self.heartbeat, # Intervalo de latido para mantener la conexión viva
+                    blocked_connection_timeout=BLOCKED_CONNECTION_TIMEOUT,
+                    connection_attempts=1, # Los reintentos se manejan aquí con backoff
+                )
+                self.connection = pika.BlockingConnection(connection_parameters)
+                self.channel = self.connection.channel()
+                if self.confirmar_publicaciones:
+                    self.channel.confirm_delivery() # El broker confirma cada publicación
+                declarar_topologia(self.channel)
+                break
+            except ERRORES_CONEXION as e:
+                if es_error_fatal(e):
+                    print(f"{self.prefijo} Error permanente de RabbitMQ: {e!r}. No se reintentará.")
+                    self.cerrar()
+                    raise
+                intento += 1
+                if self.intentos_maximos is not None and intento >= self.intentos_maximos:
+                    print(f"{self.prefijo} No fue posible conectar con RabbitMQ tras {intento} intentos.")
+                    self.cerrar()
+                    raise ConexionAgotada(f"No fue posible conectar con {self.host}:{self.puerto} tras {intento} intentos: {e!r}") from e
+                espera = self._espera_backoff(intento)
+                print(f"{self.prefijo} Error de conexión AMQP: {e}. Reintentando en {espera:.1f} segundos...")
+                time.sleep(espera)
+
+        if self._conectado_alguna_vez:
+            self.reconexiones += 1
+            print(f"{self.prefijo} Reconectado a RabbitMQ (reconexión #{self.reconexiones}).")
+        self._conectado_alguna_vez = True
+
+        # Reenviar lo que no alcanzó a confirmarse antes de la caída
+        self._reenviar_pendientes()
+        return self.channel
+
+    def _espera_backoff(self, intento):
+        # Backoff exponencial con "full jitter" para que varios clientes no reconecten a la vez
+        tope = min(ESPERA_MAXIMA, ESPERA_INICIAL * (2 ** intento))
+        return random.uniform(ESPERA_INICIAL, max(ESPERA_INICIAL, tope))
+
+    # --- Publicación ---
+    def publicar(self, exchange, routing_key, body, persistente=False, confirmar=True):
+        """
+        Publica un mensaje. Si la conexión se pierde, reconecta y reenvía todas
+        las publicaciones que no fueron confirmadas.
+
+        Con `confirmar=False` la publicación es de mejor esfuerzo: se envía por un canal sin
+        publisher confirms, no espera al broker y se descarta si la conexión se pierde.
+        """
+        properties = None
+        if persistente:
+            properties = pika.BasicProperties(delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE)
+        if not confirmar:
+            self._publicar_sin_confirmar(exchange, routing_key, body, properties)
+            return
+        self._pendientes.append((exchange, routing_key, body, properties))
+
+        while True:
+            try:
+                self.conectar()
+                self._reenviar_pendientes()
+                return
+            except ERRORES_CONEXION as e:
+                if es_error_fatal(e):
+                    raise
+                print(f"{self.prefijo} Conexión perdida al publicar: {e}. Reconectando...")
+
+    def _publicar_sin_confirmar(self, exchange, routing_key, body, properties):
+        try:
+            self.conectar()
+            if self.canal_sin_confirmar is None or not self.canal_sin_confirmar.is_open:
+                # confirm_delivery aplica a todo el canal, por lo que se usa uno aparte
+                self.canal_sin_confirmar = self.connection.channel() if self.confirmar_publicaciones else self.channel
+            self.canal_sin_confirmar.basic_publish(exchange=exchange, routing_key=routing_key, body=body,
+                                                   properties=properties)
+        except ERRORES_CONEXION as e:
+            if es_error_fatal(e):
+                raise
+            print(f"{self.prefijo} Publicación sin confirmación descartada: {e}")
+
+    def _reenviar_pendientes(self):
+        # Con confirm_delivery, basic_publish regresa sólo cuando el broker confirmó el mensaje
+        while self._pendientes:
+            exchange, routing_key, body, properties = self._pendientes[0]
+            try:
+                self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+            except (pika.exceptions.NackError, pika.exceptions.UnroutableError):
+                # El broker rechazó el mensaje: reintentarlo no ayudaría
+                self._pendientes.popleft()
+                raise
+            self._pendientes.popleft()
+
+    # --- Consumo ---
+    def consumir(self, on_message_callback, cola=None, exchange_temporal=None, prefetch_count=None):
+        """
+        Consume mensajes de una cola y reanuda el consumo tras cada reconexión.
+
+        Si no se indica `cola`, se crea una cola temporal exclusiva enlazada a `exchange_temporal`
+        (usado por el dashboard con el exchange fanout). Se bloquea hasta que se llame a
+        `detener()` o se interrumpa con CTRL+C.
+        """
+        self._detener_solicitado = False
+        while True:
+            try:
+                channel = self.conectar()
+                if cola is None:
+                    # Cola temporal exclusiva que se elimina al desconectarse; se vuelve a crear en cada reconexión
+                    result_queue = channel.queue_declare(queue='', exclusive=True, auto_delete=True)
+                    nombre_cola = result_queue.method.queue
+                    channel.queue_bind(exchange=exchange_temporal, queue=nombre_cola)
+                else:
+                    nombre_cola = cola
+                if prefetch_count is not None:
+                    channel.basic_qos(prefetch_count=prefetch_count)
+                channel.basic_consume(queue=nombre_cola, on_message_callback=on_message_callback)
+                print(f"{self.prefijo} Consumiendo de la cola '{nombre_cola}'.")
+                channel.start_consuming()
+                if self._detener_solicitado:
+                    return
+                # El canal se cerró sin pedirlo (p. ej. publicar() se reconectó dentro del callback)
+                print(f"{self.prefijo} El canal de consumo se cerró. Reanudando el consumo...")
+            except ERRORES_CONEXION as e:
+                if es_error_fatal(e):
+                    raise
+                print(f"{self.prefijo} Conexión perdida mientras se consumía: {e}. Reconectando...")
+
+    def detener(self):
+        """
+        Detiene el bucle de consumo. Se puede llamar desde otro hilo: la orden
+        se agenda en el hilo dueño de la conexión.
+        """
+        self._detener_solicitado = True
+        if self.esta_abierta():
+            self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+
+    def dormir(self, segundos):
+        """
+        Espera `segundos` atendiendo los eventos de la conexión (heartbeats incluidos),
+        para que una pausa larga no haga que el broker la dé por muerta.
+        """
+        fin = time.monotonic() + segundos
+        if self.esta_abierta():
+            try:
+                self.connection.sleep(segundos)
+                return
+            except ERRORES_CONEXION as e:
+                # La siguiente publicación se encarga de reconectar
+                print(f"{self.prefijo} Conexión perdida durante la espera: {e}")
+                self.cerrar()
+        time.sleep(max(0.0, fin - time.monotonic()))
+
+    # --- Cierre ---
+    def cerrar(self):
+        """Cierra la conexión ignorando errores de una conexión que ya se había perdido."""
+        try:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+        except ERRORES_CONEXION:
+            pass
+        finally:
+            self.connection = None
+            self.channel = None
+            self.canal_sin_confirmar = None
+
+    def __enter__(self):
+        self.conectar()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
@@ -7,142 +7,168 @@
         * Utiliza un exchange directo para recibir mensajes de una cola específica.
         * Publica resultados en el mismo exchange pero con una routing key diferente.
         * También publica resultados en un exchange fanout para el visualizador.
+        * Con --transporte memoria, recibe y publica a través de anillos en memoria compartida.
+        * Se reconecta automáticamente y reanuda el consumo si la conexión se pierde.
+        * Puede lanzar varios workers en procesos separados desde la línea de comandos (ver --help).
     ------------------------------------------------
 '''
 
 import pika
-import time
 import os # Para obtener el PID
-import json
+import sys
+import argparse
+import multiprocessing
 
 from utils import evaluar_formula
 
-# Constantes para RabbitMQ (deben coincidir con el productor)
-RABBITMQ_HOST = 'localhost'
-EXCHANGE_NAME = 'simulacion_exchange' # Único exchange para la simulación
-
-# Cola y routing key para el consumidor
-ESCENARIOS_QUEUE_NAME = 'escenarios_queue'
-ESCENARIOS_ROUTING_KEY = 'escenario.nuevo' # Necesario si el consumidor también declara y vincula la cola
-
-# Nueva cola y routing key para resultados
-RESULTADOS_QUEUE_NAME = 'resultados_queue'
-RESULTADOS_ROUTING_KEY = 'resultado.procesado' # Nueva routing key para resultados
-
-# Exhange fanout sin routing key
-DASHBOARD_EXCHANGE = 'dashboard_exchange' # Exchange para el visualizador
+# Constantes para RabbitMQ (deben coincidir con el productor) y capa de transporte
+from conexion import (
+    esperar_broker, RABBITMQ_HOST, RABBITMQ_PUERTO, EXCHANGE_NAME,
+    ESCENARIOS_QUEUE_NAME, RESULTADOS_QUEUE_NAME, DASHBOARD_EXCHANGE
+)
+from transporte import crear_transporte, agregar_argumentos_transporte, NOMBRE_MEMORIA
 
 MODEL_SETTINGS_FILE = 'model_settings_flyweight.json' # Archivo de configuración del modelo
 
-# función callback para el consumidor
-def callback_consumidor(ch, method, properties, body):
+# Transporte usado para publicar resultados (se asigna en iniciar_consumidor)
+transporte_consumidor = None
+silencioso = False # Si es True no se imprime el detalle de cada escenario
+
+# función para procesar cada escenario recibido
+def procesar_escenario(escenario_recibido):
     """
     Procesa un escenario recibido, calcula el resultado y lo publica.
+    Si ocurre un error, el transporte descarta el escenario (NACK sin reencolar en AMQP).
     """
     pid = os.getpid()
-    try:
-        escenario_recibido = json.loads(body.decode())
-        id_escenario = escenario_recibido.get("id_escenario", "ID_DESCONOCIDO")
-        datos_variables = escenario_recibido.get("datos_variables", {})
-        formula_modelo = escenario_recibido.get("formula", "x * y + z") # Fórmula por defecto
+    id_escenario = escenario_recibido.get("id_escenario", "ID_DESCONOCIDO")
+    datos_variables = escenario_recibido.get("datos_variables", {})
+    formula_modelo = escenario_recibido.get("formula", "x * y + z") # Fórmula por defecto
 
+    if not silencioso:
         print(f" [C:{pid}] Recibido Escenario ID: {id_escenario} | Datos: {datos_variables}")
 
-        # Calcular el resultado usando la fórmula del modelo
-        resultado_calculado = evaluar_formula(formula_modelo, datos_variables)
-        
+    # Calcular el resultado usando la fórmula del modelo
+    resultado_calculado = evaluar_formula(formula_modelo, datos_variables)
+    
+    if not silencioso:
         print(f" [C:{pid}] Escenario ID: {id_escenario} | Resultado: {resultado_calculado}")
 
-        # Preparar mensaje de resultado
-        mensaje_resultado = {
-            "id_escenario": id_escenario,
-            "formula": formula_modelo,
-            "valor_calculado": resultado_calculado
-        }
-
-        # Publicar el resultado al mismo exchange pero con la routing key de resultados
-        ch.basic_publish(
-            exchange=EXCHANGE_NAME,
-            routing_key=RESULTADOS_ROUTING_KEY,
-            body=json.dumps(mensaje_resultado),
-            # properties=pika.BasicProperties(
-            #     delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE # Si resultados_queue es durable
-            # )
-        )
-        print(f" [C:{pid}] Resultado para Escenario ID: {id_escenario} publicado en '{RESULTADOS_QUEUE_NAME}'.")
-        
-        # Publicar el resultado en el exchange del dashboard
-        ch.basic_publish(
-            exchange=DASHBOARD_EXCHANGE,
-            routing_key='',  # fanout no usa routing key
-            body=json.dumps(mensaje_resultado)
-        )
-        print(f" [C:{pid}] Resultado reenviado a '{DASHBOARD_EXCHANGE}' para dashboard.")
-
-        # Enviar ACK para el mensaje de escenario original
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        # print(f" [C:{pid}] ACK enviado para Escenario ID: {id_escenario}")
-
-    except json.JSONDecodeError:
-        print(f" [C:{pid}] Error al decodificar JSON: {body.decode()}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False) # Rechazar mensaje si no se puede procesar
-    except Exception as e:
-        print(f" [C:{pid}] Error procesando mensaje ID {id_escenario if 'id_escenario' in locals() else 'DESCONOCIDO'}: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False) # Rechazar en caso de otros errores
+    # Preparar mensaje de resultado
+    mensaje_resultado = {
+        "id_escenario": id_escenario,
+        "formula": formula_modelo,
+        "valor_calculado": resultado_calculado
+    }
+
+    # Publicar el resultado. Con AMQP se publica en la cola de resultados (routing key de resultados)
+    # y en el exchange fanout del dashboard; la conexión compartida reenvía la publicación si la
+    # conexión se pierde antes de confirmarse. El ACK del escenario lo envía el transporte.
+    transporte_consumidor.publicar_resultado(mensaje_resultado)
+    if not silencioso:
+        print(f" [C:{pid}] Resultado para Escenario ID: {id_escenario} publicado.")
 
 
-def iniciar_consumidor():
+def iniciar_consumidor(host=RABBITMQ_HOST, silencioso_consumidor=False, transporte="amqp",
+                       nombre_memoria=NOMBRE_MEMORIA, indice_worker=0, total_workers=1, intentos_conexion=None):
 
     """
-    Establece conexión con RabbitMQ, declara la cola (idempotente),
-    y comienza a consumir mensajes.
+    Establece conexión con RabbitMQ (declarando la topología compartida)
+    y comienza a consumir mensajes. Si la conexión se pierde, se reconecta
+    y reanuda el consumo; los escenarios sin ACK son reentregados por el broker.
+
+    Con `transporte="memoria"` se adjunta a los anillos de memoria compartida creados por
+    el productor y atiende los anillos `indice_worker, indice_worker + total_workers, ...`.
+
+    `intentos_conexion` limita los intentos de (re)conexión con RabbitMQ (None = indefinidamente).
+    Regresa True si el consumo terminó normalmente (o se interrumpió con CTRL+C) y False ante un error,
+    por ejemplo un error permanente de RabbitMQ (credenciales, permisos, topología incompatible).
     """
 
+    global transporte_consumidor, silencioso
     pid = os.getpid()
-    connection = None
+    silencioso = silencioso_consumidor
+    transporte_consumidor = crear_transporte(transporte, host=host, prefijo=f" [C:{pid}]",
+                                             intentos_maximos=intentos_conexion, nombre=nombre_memoria,
+                                             indice_worker=indice_worker, total_workers=total_workers)
+    exito = False
     try:
-        # 1. Establecer conexión con RabbitMQ
-        credentials = pika.PlainCredentials('guest', 'guest')
-        connection_parameters = pika.ConnectionParameters(RABBITMQ_HOST)
-        connection = pika.BlockingConnection(connection_parameters)
-        channel = connection.channel()
-
-        # 2. Declarar el exchange (idempotente, debe coincidir con el productor) principal y para el visualizador
-        channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='direct', durable=True)
-        channel.exchange_declare(exchange=DASHBOARD_EXCHANGE, exchange_type='fanout', durable=True) #Exchange para el visualizador
-
-        # 3. Declarar y vincular la cola de escenarios
-        channel.queue_declare(queue=ESCENARIOS_QUEUE_NAME, durable=True)
-        channel.queue_bind(exchange=EXCHANGE_NAME, queue=ESCENARIOS_QUEUE_NAME, routing_key=ESCENARIOS_ROUTING_KEY)
-        
-        # 4. Declarar y vincular la cola de resultados
-        channel.queue_declare(queue=RESULTADOS_QUEUE_NAME, durable=True) # Será consumida por el visualizador
-        channel.queue_bind(exchange=EXCHANGE_NAME, queue=RESULTADOS_QUEUE_NAME, routing_key=RESULTADOS_ROUTING_KEY)
-
-        print(f" [C:{pid}] Consumidor conectado. Exchange '{EXCHANGE_NAME}', consumiendo de '{ESCENARIOS_QUEUE_NAME}', publicando a '{RESULTADOS_QUEUE_NAME}'.")
-
-        # Esto le dice a RabbitMQ que no envíe más de un mensaje a este worker a la vez.
-#       # El worker no recibirá un nuevo mensaje hasta que haya procesado y acusado el anterior.
-#       # Ayuda a distribuir la carga de manera más uniforme entre múltiples consumidores.
-        channel.basic_qos(prefetch_count=1)
-
-        # 5. Especificar la función de callback para consumir mensajes de la cola
-        channel.basic_consume(queue=ESCENARIOS_QUEUE_NAME, on_message_callback=callback_consumidor)
-
+        # 1. Establecer conexión con RabbitMQ y declarar exchanges, colas y bindings
+        #    (o adjuntarse a la memoria compartida)
+        transporte_consumidor.conectar()
+
+        if transporte == "amqp":
+            print(f" [C:{pid}] Consumidor conectado. Exchange '{EXCHANGE_NAME}', consumiendo de '{ESCENARIOS_QUEUE_NAME}', publicando a '{RESULTADOS_QUEUE_NAME}' y '{DASHBOARD_EXCHANGE}'.")
+        else:
+            print(f" [C:{pid}] Consumidor conectado a la memoria compartida '{nombre_memoria}' (worker {indice_worker + 1} de {total_workers}).")
         print(f" [C:{pid}] [*] Esperando escenarios. Para salir presione CTRL+C")
-        channel.start_consuming()
+
+        # 2. Consumir los escenarios
+        # Con AMQP, prefetch_count=1 le dice a RabbitMQ que no envíe más de un mensaje a este worker a la vez.
+        # El worker no recibirá un nuevo mensaje hasta que haya procesado y acusado el anterior.
+        # Ayuda a distribuir la carga de manera más uniforme entre múltiples consumidores.
+        transporte_consumidor.consumir_escenarios(procesar_escenario)
+        exito = True
 
     except pika.exceptions.AMQPConnectionError as e:
         print(f" [C:{pid}] Error de conexión con RabbitMQ (Consumidor): {e}")
-        time.sleep(5)
+    except FileNotFoundError as e:
+        print(f" [C:{pid}] {e}")
     except KeyboardInterrupt:
         print(f" [C:{pid}] Consumo interrumpido.")
+        exito = True
     except Exception as e:
         print(f" [C:{pid}] Ocurrió un error inesperado en el consumidor: {e}")
     finally:
-        if connection and connection.is_open:
-            connection.close()
-            print(f" [C:{pid}] Conexión del consumidor cerrada.")
+        transporte_consumidor.cerrar()
+        print(f" [C:{pid}] Conexión del consumidor cerrada.")
+    return exito
+
+def ejecutar_worker(*args):
+    # Punto de entrada de cada proceso worker: el resultado se refleja en su exitcode
+    sys.exit(0 if iniciar_consumidor(*args) else 1)
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Consumidor de escenarios de simulación Montecarlo.")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Número de consumidores a lanzar en procesos separados. Por defecto 1.")
+    parser.add_argument("-q", "--silencioso", action="store_true", help="No imprimir el detalle de cada escenario.")
+    agregar_argumentos_transporte(parser, espera_broker=True, intentos_conexion=True)
+    return parser
 
 if __name__ == '__main__':
-    iniciar_consumidor()
+    args = crear_parser().parse_args()
+
+    # Esperar a que RabbitMQ acepte conexiones (regresa de inmediato si ya está listo)
+    if args.transporte == "amqp" and not esperar_broker(args.host, RABBITMQ_PUERTO, timeout=args.espera_broker):
+        print(f"[-] RabbitMQ no respondió en {args.host}:{RABBITMQ_PUERTO} tras {args.espera_broker} segundos.")
+        sys.exit(1)
+
+    if args.workers <= 1:
+        exito = iniciar_consumidor(args.host, args.silencioso, args.transporte, args.nombre_memoria,
+                                   intentos_conexion=args.intentos_conexion)
+        sys.exit(0 if exito else 1)
+    else:
+        # Cada worker es un proceso con su propia conexión; RabbitMQ reparte los escenarios entre ellos
+        # (en memoria compartida, cada worker atiende sus propios anillos)
+        workers = [
+            multiprocessing.Process(
+                target=ejecutar_worker,
+                args=(args.host, args.silencioso, args.transporte, args.nombre_memoria, indice, args.workers,
+                      args.intentos_conexion)
+            )
+            for indice in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # CTRL+C también llega a los workers; sólo se espera a que terminen
+            for worker in workers:
+                worker.join()
+        fallidos = sum(worker.exitcode != 0 for worker in workers)
+        if fallidos:
+            print(f"[-] {fallidos} de {len(workers)} workers terminaron con error.")
+        sys.exit(1 if fallidos else 0) # Código de salida útil para scripts y planificadores
@@ -0,0 +1,204 @@
+''''
+    Ejecución Local de la Simulación (sin RabbitMQ)
+
+    Este script ejecuta un modelo de Montecarlo en una sola máquina usando un pool de procesos,
+    sin pasar por el broker. Sirve para corridas muy grandes a la velocidad nativa de NumPy y
+    como línea base para medir el costo del camino distribuido (AMQP).
+    ------------------------------------------------
+        * Usa el mismo JSON de modelo y el mismo código de generación y evaluación de `utils`.
+        * Divide el trabajo en bloques con semillas independientes (SeedSequence), por lo que
+          una misma semilla produce los mismos resultados sin importar el número de workers.
+        * Cada worker escribe sus resultados directamente en un bloque de memoria compartida.
+        * Reporta las mismas estadísticas que el dashboard y opcionalmente le envía una muestra
+          de los resultados (los escenarios son independientes, así que los primeros lo son).
+        * Las estadísticas y el archivo de salida se calculan directamente sobre la memoria
+          compartida, sin copiar los resultados.
+    ------------------------------------------------
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pika
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from utils import (
+    generar_escenarios, evaluar_formula_vectorizada, validar_modelo_vectorizado, cargar_modelo, DIRECTORIO_MODELOS
+)
+from estadisticas import calcular_estadisticas, formatear_estadisticas
+from conexion import ConexionRabbitMQ, esperar_broker, RABBITMQ_HOST, RABBITMQ_PUERTO, DASHBOARD_EXCHANGE
+
+TAM_BLOQUE = 1_000_000 # Escenarios por bloque de trabajo
+MAXIMO_DASHBOARD = 1_000_000 # Resultados máximos que se envían al dashboard
+TAM_LOTE_DASHBOARD = 100_000 # Resultados por mensaje enviado al dashboard
+
+
+def simular_bloque(config, nombre_memoria, inicio, fin, semilla):
+    """
+    Genera y evalúa los escenarios [inicio, fin) y escribe los resultados en la memoria compartida.
+    Se ejecuta en un proceso del pool.
+    """
+    rng = np.random.default_rng(semilla)
+    n = fin - inicio
+    escenarios = generar_escenarios(config, n, rng)
+    resultados = evaluar_formula_vectorizada(config["formula"], escenarios, n)
+
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    try:
+        destino = np.ndarray((fin - inicio,), dtype=np.float64, buffer=memoria.buf, offset=inicio * 8)
+        destino[:] = resultados
+        del destino # Liberar la vista antes de cerrar la memoria compartida
+    finally:
+        memoria.close()
+    return fin - inicio
+
+
+def ejecutar_local(config, num_escenarios, workers=None, semilla=None, tam_bloque=TAM_BLOQUE, procesar=None):
+    """
+    Ejecuta `num_escenarios` escenarios del modelo en un pool de procesos.
+
+    Si se indica `procesar`, se llama con una vista (sin copia) de todos los resultados en la
+    memoria compartida antes de liberarla, y se regresa lo que devuelva; la vista no debe
+    conservarse después. Sin `procesar`, regresa una copia de los resultados en el orden de los bloques.
+    Lanza ValueError antes de iniciar el pool si el modelo no se puede generar de forma vectorizada.
+    """
+    validar_modelo_vectorizado(config)
+    bloques = [(inicio, min(inicio + tam_bloque, num_escenarios)) for inicio in range(0, num_escenarios, tam_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(bloques)) # Una semilla independiente por bloque
+
+    memoria = shared_memory.SharedMemory(create=True, size=max(1, num_escenarios) * 8)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = [
+                pool.submit(simular_bloque, config, memoria.name, inicio, fin, semilla_bloque)
+                for (inicio, fin), semilla_bloque in zip(bloques, semillas)
+            ]
+            for futuro in futuros:
+                futuro.result() # Propaga cualquier error de los workers
+        vista = np.ndarray((num_escenarios,), dtype=np.float64, buffer=memoria.buf)
+        try:
+            # Sin `procesar`, copiar los resultados fuera de la memoria compartida antes de liberarla
+            return procesar(vista) if procesar is not None else vista.copy()
+        finally:
+            del vista
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+def enviar_a_dashboard(config, resultados, host=RABBITMQ_HOST, maximo=MAXIMO_DASHBOARD, tam_lote=TAM_LOTE_DASHBOARD,
+                       total=None, intentos_conexion=None):
+    """
+    Publica en el exchange del dashboard (el mismo destino que usan los consumidores) los
+    primeros `maximo` resultados en lotes ("valores"). Como los escenarios son independientes,
+    son una muestra aleatoria de la corrida. Cada lote indica en "simulaciones" cuántos
+    resultados representa, para que el dashboard muestre el total de la corrida (`total`,
+    por defecto el número de resultados recibidos).
+
+    `intentos_conexion` limita los intentos de (re)conexión (None = indefinidamente); al
+    agotarse se lanza ConexionAgotada, una subclase de AMQPConnectionError.
+    """
+    total = len(resultados) if total is None else total
+    enviados = min(len(resultados), maximo)
+    representados = 0
+    conexion = ConexionRabbitMQ(host=host, prefijo="[Local]", intentos_maximos=intentos_conexion)
+    try:
+        for inicio in range(0, enviados, tam_lote):
+            fin = min(inicio + tam_lote, enviados)
+            hasta = fin * total // enviados # Reparto exacto del total entre los lotes
+            mensaje = {
+                "nombre_modelo": config.get("model_name", "modelo_default"),
+                "formula": config["formula"],
+                "valores": resultados[inicio:fin].tolist(),
+                "simulaciones": hasta - representados,
+            }
+            representados = hasta
+            conexion.publicar(exchange=DASHBOARD_EXCHANGE, routing_key='', body=json.dumps(mensaje))
+    finally:
+        conexion.cerrar()
+    return enviados
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Ejecución local de la simulación Montecarlo con un pool de procesos.")
+    parser.add_argument("-m", "--modelo", required=True,
+                        help="Ruta a un JSON de modelo o nombre de un archivo en --directorio-modelos.")
+    parser.add_argument("--directorio-modelos", default=DIRECTORIO_MODELOS, help="Directorio con los modelos JSON.")
+    parser.add_argument("-n", "--num-escenarios", type=int, default=1_000_000, help="Número de escenarios a simular.")
+    parser.add_argument("-s", "--semilla", type=int, default=None, help="Semilla del generador aleatorio.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Procesos del pool (por defecto, el número de CPUs).")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE, help="Escenarios por bloque de trabajo.")
+    parser.add_argument("-o", "--salida", default=None, help="Archivo .npy donde guardar todos los resultados.")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="Enviar también los resultados al dashboard a través de RabbitMQ.")
+    parser.add_argument("--max-dashboard", type=int, default=MAXIMO_DASHBOARD,
+                        help="Resultados máximos enviados al dashboard (una muestra de la corrida).")
+    parser.add_argument("--host", default=RABBITMQ_HOST, help="Host de RabbitMQ (sólo con --dashboard).")
+    parser.add_argument("--espera-broker", type=float, default=30.0,
+                        help="Segundos máximos para esperar a que RabbitMQ acepte conexiones (sólo con --dashboard).")
+    parser.add_argument("--intentos-conexion", type=int, default=3,
+                        help="Intentos máximos de (re)conexión con RabbitMQ antes de omitir el envío al dashboard.")
+    return parser
+
+
+if __name__ == '__main__':
+    parser = crear_parser()
+    args = parser.parse_args()
+
+    try:
+        modelo = cargar_modelo(args.modelo, args.directorio_modelos)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        parser.error(f"No se pudo cargar el modelo: {e}")
+    try:
+        validar_modelo_vectorizado(modelo)
+    except ValueError as e:
+        parser.error(f"Modelo no válido para la ejecución local: {e}")
+    if args.num_escenarios < 1 or args.tam_bloque < 1 or args.max_dashboard < 1 or args.intentos_conexion < 1:
+        parser.error("--num-escenarios, --tam-bloque, --max-dashboard e --intentos-conexion deben ser mayores que cero.")
+
+    workers = args.workers or os.cpu_count()
+    print(f"[Local] Modelo: {modelo.get('model_name', 'Nombre no especificado en JSON')} | Fórmula: {modelo['formula']}")
+    print(f"[Local] Simulando {args.num_escenarios} escenarios con {workers} workers...")
+
+    def procesar_resultados(resultados):
+        # Se ejecuta sobre la vista de la memoria compartida: los resultados no se copian
+        duracion = time.perf_counter() - inicio
+        print(f"[Local] {args.num_escenarios} escenarios en {duracion:.2f} s ({args.num_escenarios / duracion:,.0f} escenarios/s).")
+
+        if args.salida:
+            np.save(args.salida, resultados)
+            print(f"[Local] Resultados guardados en '{args.salida}'.")
+
+        # Copia de la muestra para el dashboard (a lo más --max-dashboard resultados): se envía después
+        # de liberar la memoria compartida, y las estadísticas reordenan los resultados en su lugar
+        muestra = resultados[:args.max_dashboard].copy() if args.dashboard else None
+
+        # Al final, porque los percentiles reordenan los resultados en su lugar
+        return calcular_estadisticas(resultados, modificar_entrada=True), muestra
+
+    inicio = time.perf_counter()
+    estadisticas, muestra = ejecutar_local(modelo, args.num_escenarios, workers, args.semilla, args.tam_bloque,
+                                           procesar=procesar_resultados)
+
+    # Mismas estadísticas que muestra el dashboard; se imprimen aunque el envío falle
+    textos = formatear_estadisticas(estadisticas)
+    for nombre, texto in textos.items():
+        print(f"  {nombre.capitalize():<12} {texto}")
+
+    if muestra is not None:
+        if not esperar_broker(args.host, RABBITMQ_PUERTO, timeout=args.espera_broker):
+            print(f"[Local] Advertencia: RabbitMQ no respondió en {args.host}:{RABBITMQ_PUERTO} tras "
+                  f"{args.espera_broker} segundos; no se envió nada al dashboard.")
+            sys.exit(1)
+        try:
+            enviados = enviar_a_dashboard(modelo, muestra, args.host, args.max_dashboard,
+                                          total=args.num_escenarios, intentos_conexion=args.intentos_conexion)
+        except pika.exceptions.AMQPConnectionError as e:
+            print(f"[Local] Advertencia: no se pudieron enviar los resultados al dashboard: {e}")
+            sys.exit(1)
+        print(f"[Local] {enviados} resultados enviados al exchange '{DASHBOARD_EXCHANGE}'.")
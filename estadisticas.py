@@ -0,0 +1,286 @@
+''''
+    Estadísticas Descriptivas de los Resultados
+
+    Cálculo de las estadísticas que muestra el dashboard, compartido con la ejecución local
+    para que ambos caminos reporten exactamente las mismas métricas.
+    ------------------------------------------------
+        * Promedio, mediana, desviación estándar y varianza (muestrales).
+        * Mínimo, máximo y percentiles P25, P50 y P75.
+        * Asimetría y curtosis (exceso de curtosis de Fisher).
+        * Histograma incremental de bins fijos y seguimiento de la convergencia de la media
+          (y cuantiles opcionales), ambos actualizados al recibir cada lote de resultados.
+    ------------------------------------------------
+'''
+
+import math
+import threading
+import numpy as np
+
+NO_DISPONIBLE = "N/A"
+Z_CONFIANZA = 1.959963984540054 # Cuantil normal para bandas de confianza del 95%
+PUNTOS_POR_DECADA = 20 # Puntos de control de la convergencia por cada potencia de 10 muestras
+
+
+def calcular_estadisticas(valores, modificar_entrada=False):
+    """
+    Calcula las estadísticas descriptivas de un arreglo (o lista) de valores.
+    Los valores NaN se descartan. Las métricas que requieren más de un valor son None
+    cuando sólo hay uno.
+
+    Con `modificar_entrada=True` los percentiles se calculan reordenando `valores` en su
+    lugar en vez de sobre una copia, lo que ahorra memoria con arreglos muy grandes.
+    """
+    from scipy.stats import kurtosis, skew # Diferido: scipy sólo se carga al calcular estadísticas
+
+    valores = np.asarray(valores, dtype=float)
+    nulos = np.isnan(valores)
+    if nulos.any():
+        valores = valores[~nulos] # Copia propia: se puede reordenar sin afectar la entrada
+        modificar_entrada = True
+    del nulos
+    n = int(valores.size)
+    estadisticas = {
+        "n": n, "promedio": None, "mediana": None, "desviacion": None, "varianza": None,
+        "minimo": None, "maximo": None, "percentiles": None, "asimetria": None, "curtosis": None,
+    }
+    if n == 0:
+        return estadisticas
+
+    estadisticas.update(
+        promedio=float(valores.mean()),
+        minimo=float(valores.min()),
+        maximo=float(valores.max()),
+    )
+    if n > 1:
+        estadisticas.update(
+            desviacion=float(valores.std(ddof=1)),
+            varianza=float(valores.var(ddof=1)),
+            asimetria=float(skew(valores)),
+            curtosis=float(kurtosis(valores)),
+        )
+    # Los percentiles al final, porque con modificar_entrada reordenan los valores
+    p25, p50, p75 = np.percentile(valores, [25, 50, 75], overwrite_input=modificar_entrada)
+    estadisticas["mediana"] = float(p50)
+    if n > 1:
+        estadisticas["percentiles"] = (float(p25), float(p50), float(p75))
+    return estadisticas
+
+
+def formatear_estadisticas(estadisticas):
+    """Convierte las estadísticas en textos listos para mostrarse ("N/A" si no aplican)."""
+    def formato(valor, decimales=2):
+        return NO_DISPONIBLE if valor is None else f"{valor:.{decimales}f}"
+
+    percentiles = estadisticas["percentiles"]
+    return {
+        "promedio": formato(estadisticas["promedio"]),
+        "mediana": formato(estadisticas["mediana"]),
+        "desviacion": formato(estadisticas["desviacion"]),
+        "varianza": formato(estadisticas["varianza"]),
+        "minimo": formato(estadisticas["minimo"]),
+        "maximo": formato(estadisticas["maximo"]),
+        "percentiles": NO_DISPONIBLE if percentiles is None else
+            f"P25: {percentiles[0]:.2f}, P50: {percentiles[1]:.2f}, P75: {percentiles[2]:.2f}",
+        "asimetria": formato(estadisticas["asimetria"], 4),
+        "curtosis": formato(estadisticas["curtosis"], 4),
+    }
+
+
+class HistogramaIncremental:
+    """
+    Histograma de bins fijos que se actualiza con cada valor (o lote) en tiempo constante por valor.
+
+    Las primeras muestras se guardan para estimar el rango inicial. Después, si llega un
+    valor fuera del rango, éste se duplica fusionando pares de bins adyacentes, de modo que
+    el número de bins se mantiene y los conteos siguen siendo exactos.
+    """
+
+    def __init__(self, num_bins=30, muestras_iniciales=100):
+        if num_bins % 2 != 0:
+            raise ValueError("El número de bins debe ser par.")
+        self.num_bins = num_bins
+        self.muestras_iniciales = muestras_iniciales
+        self.lock = threading.Lock() # Compartido entre el hilo consumidor y el de render
+        self.conteos = np.zeros(num_bins, dtype=np.int64)
+        self.minimo = None # Límite inferior del rango de los bins
+        self.ancho = None # Ancho de cada bin
+        self.total = 0
+        self.version_rango = 0 # Cambia cada vez que se modifican los bordes de los bins
+        self._iniciales = []
+
+    def agregar(self, valor):
+        if not np.isfinite(valor):
+            return # Los valores no finitos no caben en ningún bin
+        with self.lock:
+            self.total += 1
+            if self.ancho is None:
+                self._iniciales.append(valor)
+                if len(self._iniciales) >= self.muestras_iniciales:
+                    self._fijar_rango()
+                return
+            self._ampliar_rango(valor)
+            indice = int((valor - self.minimo) / self.ancho)
+            self.conteos[min(indice, self.num_bins - 1)] += 1
+
+    def agregar_lote(self, valores):
+        """Agrega un arreglo de valores con operaciones vectorizadas de NumPy."""
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[np.isfinite(valores)]
+        if valores.size == 0:
+            return
+        with self.lock:
+            self.total += int(valores.size)
+            if self.ancho is None:
+                self._iniciales.extend(valores.tolist())
+                if len(self._iniciales) >= self.muestras_iniciales:
+                    self._fijar_rango()
+                return
+            self._sumar(valores)
+
+    def _sumar(self, valores):
+        # Ampliar el rango hasta cubrir los extremos del lote y contar todos los valores a la vez
+        self._ampliar_rango(float(valores.min()))
+        self._ampliar_rango(float(valores.max()))
+        indices = np.minimum(((valores - self.minimo) / self.ancho).astype(np.int64), self.num_bins - 1)
+        self.conteos += np.bincount(indices, minlength=self.num_bins)
+
+    def _fijar_rango(self):
+        # Rango inicial con un pequeño margen alrededor de las primeras muestras
+        bajo, alto = min(self._iniciales), max(self._iniciales)
+        margen = 0.05 * (alto - bajo) if alto > bajo else max(abs(bajo), 1.0) * 0.5
+        self.minimo = bajo - margen
+        self.ancho = (alto - bajo + 2 * margen) / self.num_bins
+        iniciales, self._iniciales = self._iniciales, []
+        self._sumar(np.asarray(iniciales, dtype=float))
+        self.version_rango += 1
+
+    def _ampliar_rango(self, valor):
+        # Duplicar el rango hacia el lado del valor hasta que quede contenido
+        while not (self.minimo <= valor < self.minimo + self.ancho * self.num_bins):
+            mitad = self.num_bins // 2
+            fusionados = self.conteos[0::2] + self.conteos[1::2]
+            self.conteos[:] = 0
+            if valor < self.minimo:
+                self.conteos[mitad:] = fusionados
+                self.minimo -= self.ancho * self.num_bins
+            else:
+                self.conteos[:mitad] = fusionados
+            self.ancho *= 2
+            self.version_rango += 1
+
+    def instantanea(self):
+        """
+        Regresa (bordes, conteos, total, version_rango) con copias seguras para el hilo de render.
+        Antes de fijar el rango, los conteos se calculan al vuelo con las muestras iniciales.
+        """
+        with self.lock:
+            if self.ancho is None:
+                if not self._iniciales:
+                    return None, None, self.total, self.version_rango
+                conteos, bordes = np.histogram(self._iniciales, bins=self.num_bins)
+                return bordes, conteos, self.total, -len(self._iniciales)
+            bordes = self.minimo + self.ancho * np.arange(self.num_bins + 1)
+            return bordes, self.conteos.copy(), self.total, self.version_rango
+
+    def cuantil(self, q):
+        """
+        Estima el cuantil `q` (entre 0 y 1) interpolando dentro del bin que lo contiene.
+        El error es como máximo el ancho de un bin. Regresa None si no hay valores.
+        """
+        with self.lock:
+            if self.ancho is None:
+                return float(np.quantile(self._iniciales, q)) if self._iniciales else None
+            acumulado = np.cumsum(self.conteos)
+            objetivo = q * acumulado[-1]
+            indice = min(int(np.searchsorted(acumulado, objetivo)), self.num_bins - 1)
+            previo = acumulado[indice - 1] if indice > 0 else 0
+            fraccion = (objetivo - previo) / self.conteos[indice] if self.conteos[indice] else 0.0
+            return float(self.minimo + self.ancho * (indice + fraccion))
+
+
+class SeguimientoConvergencia:
+    """
+    Sigue la convergencia de la media (y de cuantiles opcionales) conforme llegan resultados.
+
+    La media y la varianza se actualizan por lotes con la fórmula de Welford/Chan, en tiempo
+    constante por valor y sin guardar los valores. Sólo se registra un punto de control cuando
+    el número de muestras cruza un umbral espaciado logarítmicamente, por lo que la serie tiene
+    unos cientos de puntos aunque la corrida llegue a 10^8 muestras. Los cuantiles se estiman
+    con un histograma incremental de muchos bins.
+    """
+
+    def __init__(self, cuantiles=(), puntos_por_decada=PUNTOS_POR_DECADA, z=Z_CONFIANZA, num_bins=2048):
+        self.cuantiles = tuple(cuantiles)
+        self.puntos_por_decada = puntos_por_decada
+        self.z = z
+        self.num_bins = num_bins
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0 # Suma de cuadrados de las desviaciones respecto a la media
+        self._indice_punto = 0
+        self._siguiente_punto = 1
+        self._histograma = HistogramaIncremental(self.num_bins) if self.cuantiles else None
+        self._puntos = {"n": [], "media": [], "inferior": [], "superior": [],
+                        "cuantiles": {q: [] for q in self.cuantiles}}
+
+    def agregar(self, valores):
+        """
+        Agrega un lote de valores (los no finitos se descartan). El lote se parte en los
+        umbrales que cruza, para que cada punto de control refleje exactamente sus n muestras.
+        """
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[np.isfinite(valores)]
+        inicio = 0
+        while inicio < valores.size:
+            segmento = valores[inicio:inicio + self._siguiente_punto - self.n]
+            self._combinar(segmento)
+            if self._histograma is not None:
+                self._histograma.agregar_lote(segmento)
+            inicio += segmento.size
+            if self.n == self._siguiente_punto:
+                self._registrar_punto(self._puntos)
+                self._avanzar_umbral()
+
+    def _combinar(self, segmento):
+        # Combinación de (n, media, M2) del acumulado con las del segmento (Chan et al.)
+        n_segmento = segmento.size
+        media_segmento = float(segmento.mean())
+        m2_segmento = float(((segmento - media_segmento) ** 2).sum())
+        total = self.n + n_segmento
+        delta = media_segmento - self.media
+        self.media += delta * n_segmento / total
+        self._m2 += m2_segmento + delta * delta * self.n * n_segmento / total
+        self.n = total
+
+    def _avanzar_umbral(self):
+        # Siguiente entero de la sucesión 10^(k / puntos_por_decada), siempre creciente
+        while self._siguiente_punto <= self.n:
+            self._indice_punto += 1
+            self._siguiente_punto = max(self.n + 1, math.ceil(10 ** (self._indice_punto / self.puntos_por_decada)))
+
+    def _punto_actual(self):
+        # Banda de confianza de la media: media ± z * s / sqrt(n)
+        margen = self.z * math.sqrt(self._m2 / (self.n - 1) / self.n) if self.n > 1 else 0.0
+        cuantiles = {q: self._histograma.cuantil(q) for q in self.cuantiles}
+        return self.n, self.media, self.media - margen, self.media + margen, cuantiles
+
+    def _registrar_punto(self, puntos):
+        n, media, inferior, superior, cuantiles = self._punto_actual()
+        for clave, valor in zip(("n", "media", "inferior", "superior"), (n, media, inferior, superior)):
+            puntos[clave].append(valor)
+        for q, valor in cuantiles.items():
+            puntos["cuantiles"][q].append(valor)
+
+    def puntos(self):
+        """
+        Regresa una copia de la serie de puntos de control, terminando en el estado actual:
+        {"n", "media", "inferior", "superior": listas, "cuantiles": {q: lista}}.
+        """
+        puntos = {clave: list(valores) for clave, valores in self._puntos.items() if clave != "cuantiles"}
+        puntos["cuantiles"] = {q: list(valores) for q, valores in self._puntos["cuantiles"].items()}
+        if self.n and (not puntos["n"] or puntos["n"][-1] != self.n):
+            self._registrar_punto(puntos)
+        return puntos
@@ -7,6 +7,9 @@
         * Un escenario consiste en un conjunto de valores para las variables aleatorias del modelo de Monte Carlo.
         * Utiliza un exchange directo para enviar mensajes a una cola específica.
         * Los mensajes son persistentes, lo que significa que sobrevivirán a reinicios del broker RabbitMQ.
+        * Si la conexión se pierde, se reconecta y reenvía los escenarios no confirmados.
+        * Se puede ejecutar sin interacción desde la línea de comandos (ver --help).
+        * Con --transporte memoria, los escenarios viajan por memoria compartida en lugar de RabbitMQ.
     ------------------------------------------------
 '''
 
@@ -14,18 +17,18 @@ import pika
 import time
 import json
 import sys
-from utils import generar_escenario
+import argparse
+import numpy as np
+from utils import generar_escenario, cargar_modelo, DIRECTORIO_MODELOS
 import uuid # Para generar IDs únicos para los escenarios
 import os
 
-# Constantes para RabbitMQ
-RABBITMQ_HOST = 'localhost'
-EXCHANGE_NAME = 'simulacion_exchange' # Único exchange para la simulación
-ESCENARIOS_QUEUE_NAME = 'escenarios_queue'
-ESCENARIOS_ROUTING_KEY = 'escenario.nuevo' # Routing key para el exchange directo
+# Constantes para RabbitMQ y capa de transporte
+from conexion import esperar_broker, RABBITMQ_HOST, RABBITMQ_PUERTO, EXCHANGE_NAME, ESCENARIOS_QUEUE_NAME
+from transporte import crear_transporte, agregar_argumentos_transporte, NOMBRE_MEMORIA, ESPERA_CIERRE
 
 # función para cargar la configuración del modelo
-def seleccionar_modelo(directorio_modelos="./models"):
+def seleccionar_modelo(directorio_modelos=DIRECTORIO_MODELOS):
 
     model_settings_base = {
         "formula": "x + y",
@@ -74,33 +77,38 @@ def seleccionar_modelo(directorio_modelos="./models"):
         except ValueError:
             print("Por favor, ingrese un número.")
 
-def iniciar_productor(num_mensajes, model_settings=None):
+def iniciar_productor(num_mensajes, model_settings=None, tasa=2.0, silencioso=False, host=RABBITMQ_HOST,
+                      transporte="amqp", nombre_memoria=NOMBRE_MEMORIA, workers=1, intentos_conexion=None,
+                      espera_consumidores=ESPERA_CIERRE):
     """
-    Establece conexión con RabbitMQ, declara un exchange y una cola durable,
+    Establece conexión con RabbitMQ (declarando la topología compartida)
     y envía una cantidad especificada de mensajes persistentes.
+    Si la conexión se pierde, se reconecta y continúa donde se quedó.
+
+    `tasa` es el número de escenarios por segundo (0 = sin pausa entre mensajes).
+    Con `transporte="memoria"` se crean `workers` anillos en memoria compartida, uno por consumidor.
+    `intentos_conexion` limita los intentos de (re)conexión con RabbitMQ (None = indefinidamente);
+    al agotarse, o ante un error permanente (credenciales, permisos), regresa False.
+    En memoria compartida, `espera_consumidores` son los segundos sin avance que se espera a que
+    los consumidores lean los escenarios antes de terminar.
     """
+    exito = False
+    canal = crear_transporte(transporte, host=host, prefijo="[Productor]", intentos_maximos=intentos_conexion,
+                             nombre=nombre_memoria, modelo=model_settings, num_anillos=workers,
+                             espera_cierre=espera_consumidores)
     try:
-        #1. Establecer conexión con RabbitMQ
-        credentials = pika.PlainCredentials('guest', 'guest')
-        connection_parameters = pika.ConnectionParameters(RABBITMQ_HOST, credentials=credentials)
-        connection = pika.BlockingConnection(connection_parameters)
-        channel = connection.channel()
+        # 1. Establecer conexión con RabbitMQ y declarar exchanges, colas y bindings
+        #    (o crear los anillos de memoria compartida)
+        canal.conectar()
 
-        # 2. Declarar un exchange de tipo 'direct'
-        # Los exchanges directos enrutan mensajes a colas basadas en la routing key.
-        channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='direct', durable=True)
+        if transporte == "amqp":
+            print(f"[*] Productor conectado y listo para enviar a la cola '{ESCENARIOS_QUEUE_NAME}' vía exchange '{EXCHANGE_NAME}'.")
+        else:
+            print(f"[*] Productor listo para enviar a la memoria compartida '{nombre_memoria}'.")
 
-        # 3. Declarar una cola durable
-        # durable=True asegura que la cola sobreviva a reinicios del broker RabbitMQ.
-        channel.queue_declare(queue=ESCENARIOS_QUEUE_NAME, durable=True)
-
-        # 4. Vincular la cola al exchange con la routing key
-        channel.queue_bind(exchange=EXCHANGE_NAME, queue=ESCENARIOS_QUEUE_NAME, routing_key=ESCENARIOS_ROUTING_KEY)
-
-        print(f"[*] Productor conectado y listo para enviar a la cola '{ESCENARIOS_QUEUE_NAME}' vía exchange '{EXCHANGE_NAME}'.")
-
-        # 5. Enviar múltiples escenarios
+        # 2. Enviar múltiples escenarios
         # Generar y enviar un número específico de escenarios 
+        inicio = time.perf_counter()
         for i in range(num_mensajes):
             id_escenario = str(uuid.uuid4()) # Generar un ID único para el escenario
 
@@ -113,50 +121,95 @@ def iniciar_productor(num_mensajes, model_settings=None):
                 "datos_variables": datos_escenario
             }
 
-            # Publicar el mensaje al exchange especificado con la routing key
-            # El exchange se encargará de enviarlo a las colas vinculadas con esa routing key.
-            channel.basic_publish(
-                exchange=EXCHANGE_NAME,
-                routing_key=ESCENARIOS_ROUTING_KEY, # La routing key que usa el exchange para dirigir el mensaje
-                body=json.dumps(mensaje_escenario), # Convertir el escenario a JSON
-                properties=pika.BasicProperties(
-                    delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE # Hace el mensaje persistente
-                )
-            )
+            # Publicar el mensaje a través del transporte
+            # Con AMQP, el exchange lo envía a la cola de escenarios; el mensaje es persistente
+            # y se reenvía tras una reconexión si no fue confirmado.
+            canal.publicar_escenario(mensaje_escenario)
             #print(f" [x] Productor: Enviado Escenario ID: {id_escenario} | Datos: {datos_escenario}")
-            print(f" [x] Productor: Enviado Escenario ID: {id_escenario}")
-            time.sleep(0.5) # Pequeña pausa entre mensajes
+            if not silencioso:
+                print(f" [x] Productor: Enviado Escenario ID: {id_escenario}")
+            if tasa > 0:
+                # Pausa para respetar la tasa: se calcula contra el inicio para no acumular desfase.
+                # El transporte atiende los heartbeats mientras tanto (pausas largas con -t bajo).
+                canal.dormir(max(0.0, inicio + (i + 1) / tasa - time.perf_counter()))
         print(f"[x] Productor: {num_mensajes} escenarios enviados.")
+        exito = True
 
     except pika.exceptions.AMQPConnectionError as e:
         print(f"Error al conectar con RabbitMQ: {e}")
         print("Asegúrate de que el contenedor RabbitMQ esté corriendo y los puertos estén correctamente mapeados.")
+    except KeyboardInterrupt:
+        print("[-] Productor interrumpido por el usuario.")
     except Exception as e:
         print(f"Ocurrió un error inesperado en el productor: {e}")
     finally:
-        # Cerrar la conexión
-        if 'connection' in locals() and connection.is_open:
-            connection.close()
-            print("[x] Todos los escenarios enviados.")
+        # Cerrar la conexión (en memoria compartida, espera a que los consumidores lean los escenarios)
+        try:
+            if not canal.cerrar():
+                exito = False # Quedaron escenarios sin entregar a los consumidores
             print("[-] Conexión del productor cerrada.")
+        except KeyboardInterrupt:
+            print("[-] Productor interrumpido mientras cerraba la conexión.")
+    return exito
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Productor de escenarios de simulación Montecarlo.")
+    parser.add_argument("num_mensajes_posicional", nargs="?", type=int, metavar="N",
+                        help="Número de escenarios a enviar (equivalente a --num-mensajes).")
+    parser.add_argument("-n", "--num-mensajes", type=int, default=None,
+                        help="Número de escenarios a enviar (por defecto 100).")
+    parser.add_argument("-m", "--modelo", default=None,
+                        help="Ruta a un JSON de modelo o nombre de un archivo en --directorio-modelos. "
+                             "Si se omite y la terminal es interactiva, se pregunta por el modelo.")
+    parser.add_argument("--directorio-modelos", default=DIRECTORIO_MODELOS, help="Directorio con los modelos JSON.")
+    parser.add_argument("-s", "--semilla", type=int, default=None, help="Semilla del generador aleatorio.")
+    parser.add_argument("-t", "--tasa", type=float, default=2.0,
+                        help="Escenarios por segundo (0 = sin pausa). Por defecto 2.")
+    parser.add_argument("-q", "--silencioso", action="store_true", help="No imprimir cada escenario enviado.")
+    agregar_argumentos_transporte(parser, espera_broker=True, intentos_conexion=True)
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Con --transporte memoria, número de anillos (uno por proceso consumidor).")
+    parser.add_argument("--espera-consumidores", type=float, default=ESPERA_CIERRE,
+                        help="Con --transporte memoria, segundos sin avance que se espera a que los consumidores "
+                             "lean los escenarios (o a que aparezca uno si los anillos se llenan) antes de terminar.")
+    return parser
 
 if __name__ == '__main__':
-    # Esperar un momento para asegurar que RabbitMQ esté completamente iniciado
-    print("[-] Productor esperando 3 segundos para que RabbitMQ inicie...")
-    time.sleep(3)
+    parser = crear_parser()
+    args = parser.parse_args()
 
-    # Permitir especificar el número de mensajes desde la línea de comandos
     n_msgs = 100 # Valor por defecto
-    if len(sys.argv) > 1:
+    if args.num_mensajes is not None:
+        n_msgs = args.num_mensajes
+    elif args.num_mensajes_posicional is not None:
+        n_msgs = args.num_mensajes_posicional
+
+    # Cargar el modelo indicado o, si la terminal es interactiva, preguntar por él
+    if args.modelo is not None:
         try:
-            n_msgs = int(sys.argv[1])
-        except ValueError:
-            print("[-] Argumento inválido. Usando n mensajes por defecto.")
+            modelo_seleccionado = cargar_modelo(args.modelo, args.directorio_modelos)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            parser.error(f"No se pudo cargar el modelo: {e}")
+    elif sys.stdin.isatty():
+        modelo_seleccionado = seleccionar_modelo(args.directorio_modelos)
+    else:
+        parser.error("Se requiere --modelo cuando la ejecución no es interactiva.")
+
+    if args.semilla is not None:
+        np.random.seed(args.semilla) # Escenarios reproducibles
+
+    # Esperar a que RabbitMQ acepte conexiones (regresa de inmediato si ya está listo)
+    if args.transporte == "amqp" and not esperar_broker(args.host, RABBITMQ_PUERTO, timeout=args.espera_broker):
+        print(f"[-] RabbitMQ no respondió en {args.host}:{RABBITMQ_PUERTO} tras {args.espera_broker} segundos.")
+        sys.exit(1)
 
-    modelo_seleccionado = seleccionar_modelo()
     #print(f"[-] Archivo de modelo seleccionado: {modelo_seleccionado}")
     if modelo_seleccionado:
         print(f"[-] Modelo seleccionado: {modelo_seleccionado.get('model_name', 'Nombre no especificado en JSON')}")
-        iniciar_productor(n_msgs, modelo_seleccionado)
+        exito = iniciar_productor(n_msgs, modelo_seleccionado, tasa=args.tasa, silencioso=args.silencioso, host=args.host,
+                                  transporte=args.transporte, nombre_memoria=args.nombre_memoria, workers=args.workers,
+                                  intentos_conexion=args.intentos_conexion,
+                                  espera_consumidores=args.espera_consumidores)
+        sys.exit(0 if exito else 1) # Código de salida útil para scripts y planificadores
     else:
         print("No se seleccionó ningún modelo. Saliendo.")
@@ -0,0 +1,167 @@
+from types import SimpleNamespace
+
+import pika
+import pytest
+
+import conexion
+from conexion import ConexionAgotada, ConexionRabbitMQ, es_error_fatal
+
+
+class BrokerFalso:
+    """
+    Sustituye a RabbitMQ: cada intento de conexión toma el siguiente error de `errores_conexion`
+    (o se conecta si ya no quedan), y cada `start_consuming` ejecuta la siguiente acción de `al_consumir`.
+    """
+
+    def __init__(self, errores_conexion=(), fallos_publicacion=0, al_consumir=()):
+        self.errores_conexion = list(errores_conexion)
+        self.fallos_publicacion = fallos_publicacion
+        self.al_consumir = list(al_consumir)
+        self.intentos = 0
+        self.publicados = []
+        self.consumos = []
+
+    def conectar(self, parametros):
+        self.intentos += 1
+        if self.errores_conexion:
+            raise self.errores_conexion.pop(0)
+        return ConexionFalsa(self)
+
+
+class ConexionFalsa:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return CanalFalso(self)
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def sleep(self, segundos):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class CanalFalso:
+    def __init__(self, conexion_falsa):
+        self.conexion_falsa = conexion_falsa
+        self.broker = conexion_falsa.broker
+
+    @property
+    def is_open(self):
+        return self.conexion_falsa.is_open
+
+    def confirm_delivery(self):
+        pass
+
+    def exchange_declare(self, **kwargs):
+        pass
+
+    def queue_declare(self, queue, **kwargs):
+        return SimpleNamespace(method=SimpleNamespace(queue=queue or "amq.gen-prueba"))
+
+    def queue_bind(self, **kwargs):
+        pass
+
+    def basic_qos(self, **kwargs):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        if self.broker.fallos_publicacion:
+            # La conexión se cae antes de que el broker confirme el mensaje
+            self.broker.fallos_publicacion -= 1
+            self.conexion_falsa.is_open = False
+            raise pika.exceptions.StreamLostError("conexión perdida")
+        self.broker.publicados.append(body)
+
+    def basic_consume(self, queue, on_message_callback):
+        self.broker.consumos.append(queue)
+
+    def start_consuming(self):
+        self.broker.al_consumir.pop(0)(self)
+
+    def stop_consuming(self):
+        pass
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = BrokerFalso()
+    monkeypatch.setattr(pika, "BlockingConnection", broker.conectar)
+    # Sin esperas entre reintentos
+    monkeypatch.setattr(conexion, "ESPERA_INICIAL", 0.0)
+    monkeypatch.setattr(conexion, "ESPERA_MAXIMA", 0.0)
+    return broker
+
+
+@pytest.mark.parametrize("error, fatal", [
+    (pika.exceptions.ProbableAuthenticationError("credenciales"), True),
+    (pika.exceptions.ProbableAccessDeniedError("vhost"), True),
+    (pika.exceptions.ChannelClosedByBroker(406, "PRECONDITION_FAILED"), True),
+    (pika.exceptions.ConnectionClosedByBroker(403, "ACCESS_REFUSED"), True),
+    (ConexionAgotada("sin intentos"), True),
+    (pika.exceptions.ConnectionClosedByBroker(320, "CONNECTION_FORCED"), False),
+    (pika.exceptions.StreamLostError("conexión perdida"), False),
+    (pika.exceptions.AMQPConnectionError("rechazada"), False),
+])
+def test_clasificacion_de_errores_fatales(error, fatal):
+    assert es_error_fatal(error) is fatal
+
+
+def test_reintenta_hasta_conectar(broker):
+    broker.errores_conexion = [pika.exceptions.AMQPConnectionError("caído")] * 2
+    conexion_rabbit = ConexionRabbitMQ(intentos_maximos=3)
+    assert conexion_rabbit.conectar() is not None
+    assert broker.intentos == 3
+    assert conexion_rabbit.reconexiones == 0 # La primera conexión no cuenta como reconexión
+
+
+def test_agota_los_intentos(broker):
+    broker.errores_conexion = [pika.exceptions.AMQPConnectionError("caído")] * 10
+    conexion_rabbit = ConexionRabbitMQ(intentos_maximos=3)
+    with pytest.raises(ConexionAgotada):
+        conexion_rabbit.conectar()
+    assert broker.intentos == 3
+    # publicar tampoco reintenta indefinidamente: ConexionAgotada es un error fatal
+    with pytest.raises(ConexionAgotada):
+        conexion_rabbit.publicar("exchange", "ruta", b"mensaje")
+
+
+def test_error_fatal_no_se_reintenta(broker):
+    broker.errores_conexion = [pika.exceptions.ProbableAuthenticationError("credenciales")] * 10
+    with pytest.raises(pika.exceptions.ProbableAuthenticationError):
+        ConexionRabbitMQ().conectar()
+    assert broker.intentos == 1
+
+
+def test_reenvia_pendientes_tras_reconectar(broker):
+    conexion_rabbit = ConexionRabbitMQ()
+    conexion_rabbit.publicar("exchange", "ruta", b"1")
+    broker.fallos_publicacion = 1
+    conexion_rabbit.publicar("exchange", "ruta", b"2")
+    # El mensaje sin confirmar se reenvía una sola vez tras la reconexión
+    assert broker.publicados == [b"1", b"2"]
+    assert conexion_rabbit.reconexiones == 1
+    assert not conexion_rabbit._pendientes
+
+
+def test_consumir_se_reanuda_tras_un_cierre_no_solicitado(broker):
+    conexion_rabbit = ConexionRabbitMQ()
+
+    def perder_conexion(canal):
+        canal.conexion_falsa.is_open = False
+        raise pika.exceptions.StreamLostError("conexión perdida")
+
+    broker.al_consumir = [
+        lambda canal: None, # start_consuming regresa sin que se haya pedido detener
+        perder_conexion,
+        lambda canal: conexion_rabbit.detener(),
+    ]
+    conexion_rabbit.consumir(lambda *args: None, cola="escenarios")
+    assert broker.consumos == ["escenarios"] * 3
+    assert conexion_rabbit.reconexiones == 1
+    assert not broker.al_consumir
@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+import pytest
+
+from estadisticas import HistogramaIncremental, SeguimientoConvergencia, Z_CONFIANZA, calcular_estadisticas
+
+
+def bordes_y_conteos(histograma):
+    bordes, conteos, total, _ = histograma.instantanea()
+    return bordes, conteos, total
+
+
+@pytest.mark.parametrize("por_lotes", [False, True])
+def test_histograma_conteos_exactos_al_ampliar_el_rango(por_lotes):
+    rng = np.random.default_rng(0)
+    # Las primeras muestras fijan un rango angosto; las demás obligan a duplicarlo varias veces
+    valores = np.concatenate([rng.uniform(0, 1, 50), rng.normal(0, 40, 5000)])
+    histograma = HistogramaIncremental(num_bins=16, muestras_iniciales=50)
+    if por_lotes:
+        for lote in np.array_split(valores, 37):
+            histograma.agregar_lote(lote)
+    else:
+        for valor in valores:
+            histograma.agregar(valor)
+
+    bordes, conteos, total = bordes_y_conteos(histograma)
+    assert total == len(valores) == conteos.sum()
+    assert bordes[0] <= valores.min() and valores.max() < bordes[-1]
+    # Fusionar pares de bins al duplicar el rango no pierde ni mueve ningún conteo
+    esperados, _ = np.histogram(valores, bins=bordes)
+    np.testing.assert_array_equal(conteos, esperados)
+
+
+def test_histograma_descarta_valores_no_finitos():
+    histograma = HistogramaIncremental(num_bins=4, muestras_iniciales=2)
+    histograma.agregar_lote([1.0, np.nan, 2.0, np.inf])
+    histograma.agregar(float("nan"))
+    _, conteos, total = bordes_y_conteos(histograma)
+    assert total == conteos.sum() == 2
+
+
+def test_cuantil_dentro_de_un_bin():
+    valores = np.random.default_rng(1).lognormal(size=100_000)
+    histograma = HistogramaIncremental(num_bins=2048)
+    histograma.agregar_lote(valores)
+    ancho = histograma.ancho
+    for q in (0.05, 0.5, 0.95):
+        assert abs(histograma.cuantil(q) - np.quantile(valores, q)) <= ancho
+
+
+def test_convergencia_puntos_exactos_aunque_se_partan_los_lotes():
+    valores = np.random.default_rng(2).exponential(3.0, 200_000)
+    seguimiento = SeguimientoConvergencia()
+    # Lotes de tamaños irregulares que cruzan varios puntos de control a la vez
+    inicio = 0
+    for tam in [1, 1, 7, 500, 3, 10_000, 1, 60_000] * 10:
+        seguimiento.agregar(valores[inicio:inicio + tam])
+        inicio += tam
+    seguimiento.agregar(valores[inicio:])
+
+    puntos = seguimiento.puntos()
+    n = np.array(puntos["n"])
+    assert n[-1] == len(valores)
+    assert np.all(np.diff(n) > 0)
+    assert len(n) <= 20 * math.log10(len(valores)) + 2 # Unos cientos de puntos como máximo
+
+    for i, k in enumerate(n):
+        prefijo = valores[:k]
+        assert puntos["media"][i] == pytest.approx(prefijo.mean(), rel=1e-12)
+        margen = Z_CONFIANZA * prefijo.std(ddof=1) / math.sqrt(k) if k > 1 else 0.0
+        assert puntos["superior"][i] - puntos["media"][i] == pytest.approx(margen, rel=1e-9, abs=1e-12)
+        assert puntos["media"][i] - puntos["inferior"][i] == pytest.approx(margen, rel=1e-9, abs=1e-12)
+
+
+def test_convergencia_igual_por_valor_y_por_lote():
+    valores = np.random.default_rng(3).normal(5, 2, 3000)
+    por_valor, por_lote = SeguimientoConvergencia(cuantiles=(0.5,)), SeguimientoConvergencia(cuantiles=(0.5,))
+    for valor in valores:
+        por_valor.agregar([valor])
+    por_lote.agregar(valores)
+    a, b = por_valor.puntos(), por_lote.puntos()
+    assert a["n"] == b["n"]
+    np.testing.assert_allclose(a["media"], b["media"], rtol=1e-12)
+    assert len(a["cuantiles"][0.5]) == len(a["n"])
+
+
+def test_convergencia_reiniciar_e_ignorar_no_finitos():
+    seguimiento = SeguimientoConvergencia()
+    seguimiento.agregar([1.0, np.nan, 3.0, -np.inf])
+    assert seguimiento.n == 2 and seguimiento.media == 2.0
+    seguimiento.reiniciar()
+    assert seguimiento.n == 0
+    assert seguimiento.puntos()["n"] == []
+
+
+def test_estadisticas_no_modifican_la_entrada_por_defecto():
+    valores = np.array([3.0, 1.0, 4.0, 2.0])
+    copia = valores.copy()
+    estadisticas = calcular_estadisticas(valores)
+    np.testing.assert_array_equal(valores, copia)
+    assert estadisticas["mediana"] == 2.5
+    assert calcular_estadisticas(valores, modificar_entrada=True) == estadisticas
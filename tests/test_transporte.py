@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+import pytest
+
+from transporte import AnilloMemoriaCompartida, TransporteMemoriaCompartida
+
+
+@pytest.fixture
+def anillo():
+    anillo = AnilloMemoriaCompartida(f"prueba_{uuid.uuid4().hex[:12]}", capacidad=4, ancho=2, crear=True)
+    yield anillo
+    anillo.liberar()
+
+
+def leer_todo(anillo):
+    # Lee todos los slots disponibles (pueden venir en dos tramos si dan la vuelta al anillo)
+    filas = []
+    while anillo.disponibles():
+        _, vista = anillo.leer()
+        filas.extend(vista.tolist())
+        n = len(vista)
+        del vista
+        anillo.avanzar(n)
+    return filas
+
+
+def test_ida_y_vuelta_cruzando_el_final_del_anillo(anillo):
+    for i in range(3):
+        assert anillo.escribir((i, -i))
+    assert leer_todo(anillo) == [[0, 0], [1, -1], [2, -2]]
+
+    # Los siguientes cuatro slots ocupan la posición 3 y después 0, 1 y 2
+    for i in range(3, 7):
+        assert anillo.escribir((i, -i))
+    posicion, vista = anillo.leer()
+    assert posicion == 3
+    assert len(vista) == 1 # Una lectura nunca cruza el final del anillo
+    del vista
+    assert leer_todo(anillo) == [[i, -i] for i in range(3, 7)]
+    assert int(anillo.cabecera[0]) == int(anillo.cabecera[1]) == 7
+
+
+def test_anillo_lleno_rechaza_escrituras(anillo):
+    for i in range(4):
+        assert anillo.escribir((i, i))
+    assert not anillo.escribir((9, 9))
+    assert anillo.disponibles() == 4
+    _, vista = anillo.leer(maximo=1)
+    del vista
+    anillo.avanzar(1)
+    assert anillo.escribir((9, 9))
+    assert leer_todo(anillo) == [[1, 1], [2, 2], [3, 3], [9, 9]]
+
+
+def test_cierre_de_escritura(anillo):
+    assert not anillo.cerrado
+    anillo.cerrar_escritura()
+    assert anillo.cerrado
+
+
+def test_un_solo_lector_vivo(anillo):
+    anillo.cabecera[AnilloMemoriaCompartida.POS_LECTOR] = os.getppid() # Otro proceso vivo
+    with pytest.raises(RuntimeError):
+        anillo.registrar_lector()
+
+    anillo.cabecera[AnilloMemoriaCompartida.POS_LECTOR] = 0
+    anillo.registrar_lector()
+    assert anillo.tiene_lector()
+    anillo.liberar_lector()
+    assert not anillo.tiene_lector()
+
+
+def test_lector_muerto_se_reemplaza(anillo):
+    proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+    proceso.wait()
+    anillo.cabecera[AnilloMemoriaCompartida.POS_LECTOR] = proceso.pid
+    anillo.registrar_lector()
+    assert int(anillo.cabecera[AnilloMemoriaCompartida.POS_LECTOR]) == os.getpid()
+
+
+def test_escritor_muerto_se_detecta(anillo):
+    assert not anillo.escritor_terminado() # El creador es el escritor mientras nadie más se registre
+    proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+    proceso.wait()
+    anillo.cabecera[AnilloMemoriaCompartida.POS_ESCRITOR] = proceso.pid
+    assert anillo.escritor_terminado()
+
+
+def test_consumidor_termina_si_el_productor_muere_sin_cerrar():
+    nombre = f"prueba_{uuid.uuid4().hex[:12]}"
+    codigo = (
+        "import sys\n"
+        "from transporte import TransporteMemoriaCompartida\n"
+        f"canal = TransporteMemoriaCompartida({nombre!r}, modelo={{'formula': 'x', 'variables': {{'x': {{}}}}}})\n"
+        "canal.conectar()\n"
+        "for i in range(3):\n"
+        "    canal.publicar_escenario({'datos_variables': {'x': float(i)}})\n"
+        "print('listo', flush=True)\n"
+        "sys.stdin.readline()\n"
+    )
+    productor = subprocess.Popen([sys.executable, "-c", codigo], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    consumidor = TransporteMemoriaCompartida(nombre, espera=10.0, prefijo="[Prueba]")
+    try:
+        # Esperar a que el productor haya escrito los escenarios (antes imprime otros avisos)
+        assert "listo" in (linea.strip() for linea in productor.stdout)
+        consumidor.conectar()
+        productor.kill() # SIGKILL: los anillos nunca se marcan como cerrados
+        productor.wait()
+
+        recibidos = []
+        consumidor.consumir_escenarios(lambda mensaje: recibidos.append(mensaje["datos_variables"]["x"]))
+        assert recibidos == [0.0, 1.0, 2.0]
+    finally:
+        productor.kill()
+        consumidor.cerrar()
+
+
+def test_datos_float64_sin_perdida(anillo):
+    fila = (np.pi, -1e300)
+    anillo.escribir(fila)
+    assert leer_todo(anillo) == [list(fila)]
@@ -0,0 +1,705 @@
+''''
+    Capa de Transporte de Mensajes
+
+    Este módulo abstrae cómo viajan los escenarios y los resultados entre el productor,
+    los consumidores y los visualizadores, para poder cambiar de transporte sin tocar su lógica.
+    ------------------------------------------------
+        * TransporteAMQP: comportamiento original a través de RabbitMQ (exchange directo,
+          colas durables y exchange fanout para el dashboard).
+        * TransporteMemoriaCompartida: para despliegues en un solo nodo. Usa anillos
+          (ring buffers) en `multiprocessing.shared_memory` con slots float64 de ancho fijo,
+          sin serialización ni paso por el broker.
+        * Cada anillo tiene un solo escritor y un solo lector, por lo que no requiere locks:
+          el escritor publica un slot y después avanza su contador, y el lector hace lo mismo
+          con el suyo.
+    ------------------------------------------------
+'''
+
+import abc
+import argparse
+import json
+import os
+import platform
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+from conexion import (
+    ConexionRabbitMQ, RABBITMQ_HOST, EXCHANGE_NAME, ESCENARIOS_QUEUE_NAME, ESCENARIOS_ROUTING_KEY,
+    RESULTADOS_QUEUE_NAME, RESULTADOS_ROUTING_KEY, DASHBOARD_EXCHANGE
+)
+
+TRANSPORTES = ("amqp", "memoria") # Transportes disponibles en la línea de comandos
+
+# Destinos de los resultados
+DESTINO_COLA = "cola" # Cola durable de resultados (visualizador con matplotlib)
+DESTINO_DASHBOARD = "dashboard" # Exchange fanout del dashboard
+
+# Parámetros del transporte en memoria compartida
+NOMBRE_MEMORIA = "simulacion_montecarlo" # Prefijo de los segmentos de memoria compartida
+CAPACIDAD_ANILLO = 65536 # Slots por anillo
+TAM_METADATOS = 65536 # Bytes reservados para los metadatos del modelo (JSON)
+LOTE_LECTURA = 1024 # Slots máximos leídos de un anillo en cada pasada
+ESPERA_MINIMA = 0.0001 # Espera inicial (segundos) cuando un anillo está vacío o lleno
+ESPERA_MAXIMA_ANILLO = 0.01 # Tope de la espera (segundos) cuando un anillo está vacío o lleno
+ESPERA_CIERRE = 30.0 # Segundos sin avance que el productor espera a los consumidores antes de terminar
+ARQUITECTURAS_MEMORIA = ("x86_64", "amd64") # Arquitecturas cuyo orden de memoria (TSO) suponen los anillos
+ESPERA_DUENO = 1.0 # Segundos que se espera a que un segmento recién creado por otro proceso anote a su dueño
+PASADAS_REVISION_ESCRITOR = 50 # Pasadas sin datos entre revisiones de si el escritor de cada anillo sigue vivo
+
+
+class Transporte(abc.ABC):
+    """
+    Interfaz común de los transportes. Una subclase que no implemente todos los métodos
+    abstractos falla al instanciarse.
+
+    Los mensajes son diccionarios con la misma forma en todos los transportes:
+    escenarios con "id_escenario", "formula" y "datos_variables", y resultados con
+    "id_escenario", "formula" y "valor_calculado".
+    """
+
+    prefijo = "[Transporte]"
+
+    @abc.abstractmethod
+    def conectar(self):
+        """Establece la conexión o se adjunta a los recursos compartidos."""
+
+    @abc.abstractmethod
+    def publicar_escenario(self, mensaje):
+        """Publica un escenario para los consumidores."""
+
+    @abc.abstractmethod
+    def publicar_resultado(self, mensaje):
+        """Publica el resultado de un escenario para los visualizadores."""
+
+    @abc.abstractmethod
+    def consumir_escenarios(self, procesar):
+        """Llama a `procesar(mensaje)` por cada escenario recibido. Se bloquea mientras consume."""
+
+    @abc.abstractmethod
+    def consumir_resultados(self, procesar, destino=DESTINO_COLA):
+        """Llama a `procesar(mensaje)` por cada resultado recibido. Se bloquea mientras consume."""
+
+    @abc.abstractmethod
+    def detener(self):
+        """Detiene el consumo. Se puede llamar desde otro hilo."""
+
+    @abc.abstractmethod
+    def cerrar(self):
+        """Cierra el transporte. Regresa False si quedaron mensajes publicados sin entregar."""
+
+    def dormir(self, segundos):
+        """Pausa entre publicaciones sin desatender el transporte."""
+        time.sleep(segundos)
+
+    def _procesar_seguro(self, procesar, mensaje):
+        # Regresa False si el mensaje no se pudo procesar, para descartarlo sin detener el consumo
+        try:
+            procesar(mensaje)
+            return True
+        except Exception as e:
+            print(f"{self.prefijo} Error procesando mensaje ID {mensaje.get('id_escenario', 'DESCONOCIDO')}: {e}")
+            return False
+
+
+# --- Transporte a través de RabbitMQ ---
+class TransporteAMQP(Transporte):
+    """
+    Transporte a través de RabbitMQ usando la conexión compartida con reconexión automática.
+    """
+
+    def __init__(self, host=RABBITMQ_HOST, prefijo="[Transporte AMQP]", confirmar_publicaciones=True,
+                 intentos_maximos=None):
+        self.prefijo = prefijo
+        self.conexion = ConexionRabbitMQ(host=host, prefijo=prefijo, confirmar_publicaciones=confirmar_publicaciones,
+                                         intentos_maximos=intentos_maximos)
+
+    def conectar(self):
+        self.conexion.conectar()
+
+    def publicar_escenario(self, mensaje):
+        # Mensaje persistente: sobrevive a reinicios del broker
+        self.conexion.publicar(
+            exchange=EXCHANGE_NAME,
+            routing_key=ESCENARIOS_ROUTING_KEY,
+            body=json.dumps(mensaje),
+            persistente=True
+        )
+
+    def publicar_resultado(self, mensaje):
+        """
+        Publica el resultado en la cola de resultados (con confirmación del broker) y una copia
+        en el exchange fanout del dashboard. La copia es sólo para mostrar, por lo que se publica
+        sin esperar confirmación y se pierde si la conexión cae.
+
+        La entrega es "al menos una vez": si la conexión cae después de publicar el resultado pero
+        antes del ACK del escenario, el broker reentrega el escenario y el resultado se publica de
+        nuevo, de modo que la cola y el dashboard pueden recibir duplicados.
+        """
+        body = json.dumps(mensaje)
+        # Cola de resultados (mismo exchange, routing key de resultados)
+        self.conexion.publicar(exchange=EXCHANGE_NAME, routing_key=RESULTADOS_ROUTING_KEY, body=body)
+        # Exchange fanout del dashboard (no usa routing key), de mejor esfuerzo
+        self.conexion.publicar(exchange=DASHBOARD_EXCHANGE, routing_key='', body=body, confirmar=False)
+
+    def _crear_callback(self, procesar):
+        def responder(ch, method, aceptado):
+            if not ch.is_open:
+                # publicar() se reconectó mientras se procesaba el mensaje: su canal ya no existe
+                # y el broker lo reentregará por la nueva conexión
+                print(f"{self.prefijo} Canal cerrado antes del ACK; el mensaje será reentregado.")
+                return
+            if aceptado:
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+            else:
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+        def callback(ch, method, properties, body):
+            try:
+                mensaje = json.loads(body.decode())
+            except json.JSONDecodeError:
+                print(f"{self.prefijo} Error al decodificar JSON: {body.decode()}")
+                responder(ch, method, False) # No reencolar mensajes malformados
+                return
+            responder(ch, method, self._procesar_seguro(procesar, mensaje))
+        return callback
+
+    def consumir_escenarios(self, procesar):
+        # prefetch_count=1 reparte la carga de manera uniforme entre varios consumidores
+        self.conexion.consumir(self._crear_callback(procesar), cola=ESCENARIOS_QUEUE_NAME, prefetch_count=1)
+
+    def consumir_resultados(self, procesar, destino=DESTINO_COLA):
+        if destino == DESTINO_DASHBOARD:
+            # Cola temporal exclusiva enlazada al exchange fanout
+            self.conexion.consumir(self._crear_callback(procesar), exchange_temporal=DASHBOARD_EXCHANGE)
+        else:
+            self.conexion.consumir(self._crear_callback(procesar), cola=RESULTADOS_QUEUE_NAME)
+
+    def detener(self):
+        self.conexion.detener()
+
+    def dormir(self, segundos):
+        # Atiende los heartbeats durante la pausa
+        self.conexion.dormir(segundos)
+
+    def cerrar(self):
+        self.conexion.cerrar()
+        return True # Lo publicado ya fue confirmado por el broker
+
+
+# --- Transporte en memoria compartida ---
+def _adjuntar_memoria(nombre):
+    """
+    Se adjunta a un segmento existente sin registrarlo en el resource tracker, para que
+    al terminar este proceso no se elimine un segmento que pertenece a otro.
+    """
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False) # Python 3.13+
+    except TypeError:
+        memoria = shared_memory.SharedMemory(name=nombre)
+        if os.name == "posix":
+            resource_tracker.unregister(memoria._name, "shared_memory")
+        return memoria
+
+
+def _proceso_vivo(pid):
+    """Indica si existe un proceso con ese PID (un PID reutilizado se toma como vivo)."""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, OverflowError, ValueError):
+        return False
+    except PermissionError:
+        return True # Existe, pero pertenece a otro usuario
+    return True
+
+
+def _leer_entero(memoria, posicion):
+    # Entero int64 en la posición `posicion` (en múltiplos de 8 bytes) del segmento
+    return int(np.frombuffer(bytes(memoria.buf[posicion * 8:(posicion + 1) * 8]), dtype=np.int64)[0])
+
+
+def _esperar_dueno(memoria, posicion_dueno):
+    """
+    PID del dueño anotado en un segmento existente. Otro proceso puede haberlo creado sin
+    alcanzar a escribir su PID (0), por lo que se espera hasta ESPERA_DUENO segundos antes
+    de darlo por huérfano.
+    """
+    if memoria.size < (posicion_dueno + 1) * 8:
+        return 0
+    limite = time.monotonic() + ESPERA_DUENO
+    while True:
+        dueno = _leer_entero(memoria, posicion_dueno)
+        if dueno or time.monotonic() >= limite:
+            return dueno
+        time.sleep(0.01)
+
+
+def _crear_memoria(nombre, tam, posicion_dueno):
+    """
+    Crea un segmento y anota el PID de este proceso como dueño (int64 en `posicion_dueno`).
+    Si ya existe un segmento con ese nombre, sólo se reemplaza cuando su dueño ya terminó
+    (segmento huérfano de una ejecución que terminó de forma abrupta); si sigue vivo se lanza
+    FileExistsError para no destruir una ejecución en curso.
+    """
+    try:
+        memoria = shared_memory.SharedMemory(name=nombre, create=True, size=tam)
+    except FileExistsError:
+        anterior = shared_memory.SharedMemory(name=nombre)
+        dueno = _esperar_dueno(anterior, posicion_dueno)
+        anterior.close()
+        if _proceso_vivo(dueno):
+            if os.name == "posix":
+                resource_tracker.unregister(anterior._name, "shared_memory") # No es nuestro: no eliminarlo al salir
+            raise FileExistsError(f"La memoria compartida '{nombre}' pertenece a un proceso activo (PID {dueno}). "
+                                  f"Use otro --nombre-memoria.")
+        anterior.unlink()
+        memoria = shared_memory.SharedMemory(name=nombre, create=True, size=tam)
+    memoria.buf[posicion_dueno * 8:(posicion_dueno + 1) * 8] = np.int64(os.getpid()).tobytes()
+    return memoria
+
+
+class AnilloMemoriaCompartida:
+    """
+    Ring buffer de un escritor y un lector sobre memoria compartida.
+
+    Cabecera (int64): [escritos, leidos, cerrado, capacidad, ancho, pid_dueno, pid_lector, pid_escritor].
+    Los datos son una matriz float64 de `capacidad` x `ancho`. El escritor sólo modifica
+    `escritos` y el lector sólo `leidos`, siempre después de copiar o leer los datos del slot.
+    Un segundo lector rompería esta regla (ambos avanzarían `leidos`), por lo que el lector se
+    registra con `registrar_lector()` y se rechaza otro mientras el primero siga vivo.
+    Si el escritor termina sin cerrar el anillo (p. ej. con SIGKILL), `escritor_terminado()`
+    permite al lector darlo por cerrado en lugar de esperar indefinidamente.
+
+    Orden de memoria: no hay barreras explícitas. Que el lector vea los datos de un slot antes
+    que el nuevo valor de `escritos` (y el escritor el nuevo `leidos` sólo después de que el
+    slot se leyó) depende de que el hardware no reordene escrituras entre sí ni lecturas entre
+    sí, como garantiza x86-64 (TSO). En arquitecturas con un modelo de memoria más débil
+    (p. ej. ARM) haría falta una barrera entre los datos y el contador, que NumPy no ofrece,
+    por lo que TransporteMemoriaCompartida se rechaza en ellas (ver ARQUITECTURAS_MEMORIA).
+    """
+
+    TAM_CABECERA = 8 # Enteros int64 en la cabecera (64 bytes)
+    POS_DUENO = 5 # PID del proceso que creó el anillo
+    POS_LECTOR = 6 # PID del lector registrado (0 = ninguno)
+    POS_ESCRITOR = 7 # PID del escritor registrado (0 = ninguno; se toma al dueño)
+
+    def __init__(self, nombre, capacidad=None, ancho=None, crear=False):
+        self.nombre = nombre
+        self.creador = crear
+        tam_cabecera = self.TAM_CABECERA * 8
+        if crear:
+            self.memoria = _crear_memoria(nombre, tam_cabecera + capacidad * ancho * 8, self.POS_DUENO)
+            self.cabecera = np.ndarray((self.TAM_CABECERA,), dtype=np.int64, buffer=self.memoria.buf)
+            self.cabecera[:self.POS_DUENO] = 0
+            self.cabecera[self.POS_LECTOR:] = 0
+            self.registrar_escritor() # Hasta que otro proceso se registre, escribe el creador
+            self.cabecera[3] = capacidad
+            self.cabecera[4] = ancho
+        else:
+            self.memoria = _adjuntar_memoria(nombre)
+            self.cabecera = np.ndarray((self.TAM_CABECERA,), dtype=np.int64, buffer=self.memoria.buf)
+        self.capacidad = int(self.cabecera[3])
+        self.ancho = int(self.cabecera[4])
+        self.datos = np.ndarray((self.capacidad, self.ancho), dtype=np.float64,
+                                buffer=self.memoria.buf, offset=tam_cabecera)
+
+    def disponibles(self):
+        return int(self.cabecera[0]) - int(self.cabecera[1])
+
+    @property
+    def cerrado(self):
+        return bool(self.cabecera[2])
+
+    def registrar_lector(self):
+        """Registra este proceso como el lector del anillo. Falla si ya hay otro lector vivo."""
+        lector = int(self.cabecera[self.POS_LECTOR])
+        if lector not in (0, os.getpid()) and _proceso_vivo(lector):
+            raise RuntimeError(f"El anillo '{self.nombre}' ya tiene un lector activo (PID {lector}); "
+                               f"sólo se admite un lector por anillo.")
+        self.cabecera[self.POS_LECTOR] = os.getpid()
+
+    def liberar_lector(self):
+        if int(self.cabecera[self.POS_LECTOR]) == os.getpid():
+            self.cabecera[self.POS_LECTOR] = 0
+
+    def tiene_lector(self):
+        """Indica si hay un lector registrado que siga vivo."""
+        return _proceso_vivo(int(self.cabecera[self.POS_LECTOR]))
+
+    def registrar_escritor(self):
+        self.cabecera[self.POS_ESCRITOR] = os.getpid()
+
+    def escritor_terminado(self):
+        """Indica si el escritor registrado (o, si no hay uno, el dueño) ya terminó."""
+        escritor = int(self.cabecera[self.POS_ESCRITOR]) or int(self.cabecera[self.POS_DUENO])
+        return escritor != 0 and not _proceso_vivo(escritor)
+
+    def cerrar_escritura(self):
+        """Indica al lector que no se escribirán más slots."""
+        self.cabecera[2] = 1
+
+    def escribir(self, fila):
+        """Escribe una fila en el siguiente slot. Regresa False si el anillo está lleno."""
+        escritos = int(self.cabecera[0])
+        if escritos - int(self.cabecera[1]) >= self.capacidad:
+            return False
+        self.datos[escritos % self.capacidad] = fila
+        self.cabecera[0] = escritos + 1 # Publicar el slot después de escribirlo
+        return True
+
+    def leer(self, maximo=LOTE_LECTURA):
+        """
+        Regresa (posición, vista) con hasta `maximo` slots contiguos listos para leerse,
+        sin copiarlos. Se deben liberar con avanzar() después de procesarlos.
+        """
+        leidos = int(self.cabecera[1])
+        inicio = leidos % self.capacidad
+        n = min(int(self.cabecera[0]) - leidos, maximo, self.capacidad - inicio)
+        return leidos, self.datos[inicio:inicio + n]
+
+    def avanzar(self, n):
+        self.cabecera[1] = int(self.cabecera[1]) + n
+
+    def liberar(self):
+        """Cierra el segmento; si este proceso lo creó, también lo elimina."""
+        del self.datos, self.cabecera # Las vistas deben liberarse antes de cerrar
+        self.memoria.close()
+        if self.creador:
+            self.memoria.unlink()
+
+
+class TransporteMemoriaCompartida(Transporte):
+    """
+    Transporte para un solo nodo basado en anillos de memoria compartida.
+
+    El productor crea los segmentos (con `modelo`): los metadatos del modelo y, por cada
+    anillo, uno de escenarios (un slot por escenario, una columna por variable) y otro de
+    resultados (un valor por slot). El productor reparte los escenarios entre los anillos.
+    Cada proceso consumidor atiende los anillos `indice_worker, indice_worker + total_workers, ...`
+    y escribe en los anillos de resultados correspondientes. Un solo visualizador lee todos
+    los anillos de resultados; cada lector se registra en sus anillos y se rechaza un segundo
+    lector de los mismos anillos.
+
+    El segmento de metadatos guarda [longitud (8 bytes), PID del productor (8 bytes), JSON].
+    Se crea primero para reclamar el nombre, y la longitud se escribe al final para indicar
+    que los anillos están listos.
+
+    Al cerrar, el productor espera sólo a que los consumidores lean los escenarios pendientes
+    (mientras haya avance, hasta `espera_cierre` segundos sin avance) y después elimina los
+    nombres de los segmentos: los procesos ya adjuntos conservan su mapeo, de modo que los
+    consumidores terminan de escribir y el visualizador de leer sin que el productor los espere.
+    Si un anillo de resultados se llena y no hay un lector vivo, los resultados se descartan
+    en lugar de bloquear al consumidor.
+    """
+
+    def __init__(self, nombre=NOMBRE_MEMORIA, modelo=None, num_anillos=1, capacidad=CAPACIDAD_ANILLO,
+                 indice_worker=0, total_workers=1, espera=30.0, espera_cierre=ESPERA_CIERRE,
+                 prefijo="[Transporte Memoria]"):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.creador = modelo is not None # Sólo el productor crea (y al final elimina) los segmentos
+        self.num_anillos = num_anillos
+        self.capacidad = capacidad
+        self.indice_worker = indice_worker
+        self.total_workers = total_workers
+        self.espera = espera # Segundos máximos para esperar a que el productor cree los segmentos
+        self.espera_cierre = espera_cierre # Segundos sin avance que se espera a los consumidores
+        self.resultados_descartados = 0
+        self.prefijo = prefijo
+        self.metadatos = None
+        self.memoria_metadatos = None
+        self.anillos_escenarios = []
+        self.anillos_resultados = []
+        self._siguiente = 0 # Anillo en el que el productor intentará escribir primero
+        self._anillo_actual = 0 # Anillo del escenario que se está procesando
+        self._detenido = False
+
+    # --- Conexión ---
+    def conectar(self):
+        if self.memoria_metadatos is not None:
+            return
+        arquitectura = platform.machine()
+        if arquitectura.lower() not in ARQUITECTURAS_MEMORIA:
+            raise RuntimeError(f"El transporte en memoria compartida sólo es seguro en x86-64 y esta máquina es "
+                               f"'{arquitectura}'. Use --transporte amqp.")
+        if self.creador:
+            self._crear_segmentos()
+        else:
+            self._adjuntar_segmentos()
+
+    def _crear_segmentos(self):
+        self.metadatos = {
+            "model_name": self.modelo.get("model_name", "modelo_default"),
+            "formula": self.modelo["formula"],
+            "variables": list(self.modelo["variables"].keys()), # Orden de las columnas de cada slot
+            "num_anillos": self.num_anillos,
+        }
+        contenido = json.dumps(self.metadatos).encode()
+        if len(contenido) + 16 > TAM_METADATOS:
+            raise ValueError("Los metadatos del modelo no caben en la memoria compartida.")
+
+        # Reclamar el nombre con el segmento de metadatos (falla si otro productor vivo lo usa)
+        self.memoria_metadatos = _crear_memoria(f"{self.nombre}_meta", TAM_METADATOS, 1)
+        try:
+            for i in range(self.num_anillos):
+                self.anillos_escenarios.append(AnilloMemoriaCompartida(
+                    f"{self.nombre}_esc_{i}", self.capacidad, len(self.metadatos["variables"]), crear=True))
+                self.anillos_resultados.append(AnilloMemoriaCompartida(
+                    f"{self.nombre}_res_{i}", self.capacidad, 1, crear=True))
+        except Exception:
+            self._liberar()
+            raise
+        # La longitud se escribe al final: indica que los anillos están listos
+        self.memoria_metadatos.buf[16:16 + len(contenido)] = contenido
+        self.memoria_metadatos.buf[:8] = len(contenido).to_bytes(8, "little")
+        print(f"{self.prefijo} Memoria compartida '{self.nombre}' creada con {self.num_anillos} anillo(s) de {self.capacidad} slots.")
+
+    def _adjuntar_segmentos(self):
+        limite = time.monotonic() + self.espera
+        while True:
+            try:
+                memoria = _adjuntar_memoria(f"{self.nombre}_meta")
+                longitud = int.from_bytes(bytes(memoria.buf[:8]), "little")
+                if longitud > 0:
+                    break
+                memoria.close()
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= limite:
+                raise FileNotFoundError(f"No se encontró la memoria compartida '{self.nombre}'. ¿Ya se inició el productor?")
+            time.sleep(0.1)
+
+        self.memoria_metadatos = memoria
+        self.metadatos = json.loads(bytes(memoria.buf[16:16 + longitud]).decode())
+        self.num_anillos = self.metadatos["num_anillos"]
+        self.anillos_escenarios = [AnilloMemoriaCompartida(f"{self.nombre}_esc_{i}") for i in range(self.num_anillos)]
+        self.anillos_resultados = [AnilloMemoriaCompartida(f"{self.nombre}_res_{i}") for i in range(self.num_anillos)]
+        print(f"{self.prefijo} Adjuntado a la memoria compartida '{self.nombre}' ({self.num_anillos} anillo(s)).")
+
+    def _anillos_propios(self):
+        return range(self.indice_worker, self.num_anillos, self.total_workers)
+
+    def _esperar(self, espera):
+        # Espera con backoff mientras un anillo está vacío o lleno
+        time.sleep(espera)
+        return min(espera * 2, ESPERA_MAXIMA_ANILLO)
+
+    # --- Publicación ---
+    def publicar_escenario(self, mensaje):
+        """
+        Escribe el escenario en el siguiente anillo con espacio. Si todos están llenos y ningún
+        consumidor los lee durante `espera_cierre` segundos, lanza TimeoutError.
+        """
+        fila = [mensaje["datos_variables"][var] for var in self.metadatos["variables"]]
+        espera = ESPERA_MINIMA
+        sin_lector_desde = None
+        while not self._detenido:
+            # Reparto round-robin; si un anillo está lleno se intenta con el siguiente
+            for _ in range(self.num_anillos):
+                anillo = self.anillos_escenarios[self._siguiente]
+                self._siguiente = (self._siguiente + 1) % self.num_anillos
+                if anillo.escribir(fila):
+                    return
+            if any(anillo.tiene_lector() for anillo in self.anillos_escenarios):
+                sin_lector_desde = None
+            elif sin_lector_desde is None:
+                sin_lector_desde = time.monotonic()
+            elif time.monotonic() - sin_lector_desde > self.espera_cierre:
+                raise TimeoutError(f"Los anillos de escenarios están llenos y ningún consumidor los lee "
+                                   f"desde hace {self.espera_cierre} segundos.")
+            espera = self._esperar(espera)
+
+    def publicar_resultado(self, mensaje):
+        """
+        Escribe el resultado en el anillo de resultados del escenario actual. Si el anillo está
+        lleno, espera mientras haya un lector vivo; sin lector, descarta el resultado.
+        """
+        anillo = self.anillos_resultados[self._anillo_actual]
+        espera = ESPERA_MINIMA
+        while not anillo.escribir((mensaje["valor_calculado"],)):
+            if self._detenido:
+                return
+            if not anillo.tiene_lector():
+                self.resultados_descartados += 1
+                if self.resultados_descartados == 1:
+                    print(f"{self.prefijo} El anillo de resultados está lleno y no hay un visualizador leyéndolo; "
+                          f"los resultados se descartarán mientras no haya lector.")
+                return
+            espera = self._esperar(espera)
+
+    # --- Consumo ---
+    def _consumir(self, indices, anillos, crear_mensaje, procesar):
+        """
+        Lee los anillos indicados hasta que todos estén cerrados y vacíos (o se llame a detener()).
+        Los slots se leen en lotes contiguos directamente de la memoria compartida. Este proceso
+        se registra como el lector de los anillos mientras consume.
+        """
+        registrados = []
+        try:
+            for i in indices:
+                anillos[i].registrar_lector()
+                registrados.append(anillos[i])
+            self._leer_anillos(indices, anillos, crear_mensaje, procesar)
+        finally:
+            for anillo in registrados:
+                anillo.liberar_lector()
+
+    def _leer_anillos(self, indices, anillos, crear_mensaje, procesar):
+        espera = ESPERA_MINIMA
+        pasadas_vacias = 0
+        abandonados = set() # Anillos cuyo escritor terminó sin cerrarlos
+        while not self._detenido:
+            leidos_en_pasada = 0
+            terminados = 0
+            for i in indices:
+                anillo = anillos[i]
+                cerrado = anillo.cerrado # Leer antes que los disponibles para no perder los últimos slots
+                posicion, filas = anillo.leer()
+                if len(filas) == 0:
+                    terminados += cerrado or i in abandonados
+                    continue
+                self._anillo_actual = i
+                n = len(filas)
+                for j, fila in enumerate(filas):
+                    self._procesar_seguro(procesar, crear_mensaje(i, posicion + j, fila))
+                del filas, fila # Soltar las vistas antes de liberar los slots
+                anillo.avanzar(n)
+                leidos_en_pasada += n
+            if terminados == len(indices):
+                return
+            if leidos_en_pasada == 0:
+                espera = self._esperar(espera)
+                pasadas_vacias += 1
+                if pasadas_vacias % PASADAS_REVISION_ESCRITOR == 0:
+                    # Un escritor que terminó sin cerrar el anillo ya no escribirá más: lo que quede
+                    # se lee en las siguientes pasadas y después el anillo cuenta como cerrado
+                    for i in indices:
+                        if i not in abandonados and not anillos[i].cerrado and anillos[i].escritor_terminado():
+                            print(f"{self.prefijo} El proceso que escribía en el anillo {i} terminó sin cerrarlo; "
+                                  f"se da por cerrado.")
+                            abandonados.add(i)
+            else:
+                espera = ESPERA_MINIMA
+
+    def consumir_escenarios(self, procesar):
+        self.conectar()
+        variables = self.metadatos["variables"]
+        formula = self.metadatos["formula"]
+
+        def crear_mensaje(anillo, posicion, fila):
+            return {
+                "id_escenario": f"{anillo}-{posicion}",
+                "formula": formula,
+                "datos_variables": dict(zip(variables, fila.tolist())),
+            }
+
+        for i in self._anillos_propios():
+            self.anillos_resultados[i].registrar_escritor()
+        try:
+            self._consumir(self._anillos_propios(), self.anillos_escenarios, crear_mensaje, procesar)
+        finally:
+            # Avisar al lector de resultados que este worker terminó
+            for i in self._anillos_propios():
+                self.anillos_resultados[i].cerrar_escritura()
+
+    def consumir_resultados(self, procesar, destino=DESTINO_COLA):
+        # En memoria compartida hay un solo flujo de resultados, sin importar el destino
+        self.conectar()
+        formula = self.metadatos["formula"]
+
+        def crear_mensaje(anillo, posicion, fila):
+            return {"id_escenario": f"{anillo}-{posicion}", "formula": formula, "valor_calculado": float(fila[0])}
+
+        self._consumir(range(self.num_anillos), self.anillos_resultados, crear_mensaje, procesar)
+
+    def detener(self):
+        self._detenido = True
+
+    # --- Cierre ---
+    def cerrar(self):
+        """
+        Libera los segmentos. El productor marca los anillos de escenarios como cerrados, espera
+        a que los consumidores lean los escenarios pendientes y después elimina los segmentos.
+        """
+        if self.memoria_metadatos is None:
+            return True
+        entregados = True
+        try:
+            if self.creador:
+                for anillo in self.anillos_escenarios:
+                    anillo.cerrar_escritura()
+                entregados = self._esperar_consumidores()
+        finally:
+            if self.resultados_descartados:
+                print(f"{self.prefijo} {self.resultados_descartados} resultado(s) descartado(s) por falta de lector.")
+            self._liberar()
+        return entregados
+
+    def _esperar_consumidores(self):
+        # Esperar mientras los consumidores avancen; sin avance durante espera_cierre segundos, terminar
+        pendientes = sum(anillo.disponibles() for anillo in self.anillos_escenarios)
+        if pendientes:
+            print(f"{self.prefijo} Esperando a que los consumidores lean {pendientes} escenario(s) pendiente(s)...")
+        ultimo_avance = time.monotonic()
+        while pendientes and not self._detenido:
+            time.sleep(0.1)
+            restantes = sum(anillo.disponibles() for anillo in self.anillos_escenarios)
+            if restantes < pendientes:
+                pendientes, ultimo_avance = restantes, time.monotonic()
+            elif time.monotonic() - ultimo_avance > self.espera_cierre:
+                print(f"{self.prefijo} Ningún consumidor avanzó en {self.espera_cierre} segundos; "
+                      f"{pendientes} escenario(s) quedaron sin leer.")
+                break
+        return pendientes == 0
+
+    def _liberar(self):
+        for anillo in self.anillos_escenarios + self.anillos_resultados:
+            anillo.liberar()
+        self.anillos_escenarios, self.anillos_resultados = [], []
+        self.memoria_metadatos.close()
+        if self.creador:
+            self.memoria_metadatos.unlink()
+        self.memoria_metadatos = None
+
+
+def _entero_positivo(texto):
+    valor = int(texto)
+    if valor < 1:
+        raise argparse.ArgumentTypeError("debe ser mayor que cero")
+    return valor
+
+
+def agregar_argumentos_transporte(parser, espera_broker=False, intentos_conexion=False):
+    """
+    Agrega a un parser de argparse las opciones de conexión y transporte comunes a los scripts:
+    --host, --transporte, --nombre-memoria y, si se indica, --espera-broker e --intentos-conexion.
+    """
+    parser.add_argument("--host", default=RABBITMQ_HOST, help="Host de RabbitMQ.")
+    if espera_broker:
+        parser.add_argument("--espera-broker", type=float, default=30.0,
+                            help="Segundos máximos para esperar a que RabbitMQ acepte conexiones.")
+    if intentos_conexion:
+        parser.add_argument("--intentos-conexion", type=_entero_positivo, default=None,
+                            help="Intentos máximos de (re)conexión con RabbitMQ antes de terminar con error "
+                                 "(por defecto, reintentar indefinidamente).")
+    parser.add_argument("--transporte", choices=TRANSPORTES, default="amqp",
+                        help="Transporte de los mensajes: RabbitMQ o memoria compartida (un solo nodo).")
+    parser.add_argument("--nombre-memoria", default=NOMBRE_MEMORIA, help="Nombre de la memoria compartida.")
+
+
+def crear_transporte(tipo="amqp", host=RABBITMQ_HOST, prefijo="[Transporte]", confirmar_publicaciones=True,
+                     intentos_maximos=None, **opciones_memoria):
+    """
+    Crea el transporte indicado. `intentos_maximos` limita los reintentos de conexión con AMQP
+    (None = indefinidamente). Las opciones adicionales se pasan al transporte en memoria compartida
+    (nombre, modelo, num_anillos, capacidad, indice_worker, total_workers, espera, espera_cierre).
+    """
+    if tipo == "amqp":
+        return TransporteAMQP(host=host, prefijo=prefijo, confirmar_publicaciones=confirmar_publicaciones,
+                              intentos_maximos=intentos_maximos)
+    elif tipo == "memoria":
+        return TransporteMemoriaCompartida(prefijo=prefijo, **opciones_memoria)
+    else:
+        raise ValueError(f"Transporte '{tipo}' no soportado.")
@@ -1,18 +1,30 @@
+import json
+import os
 import numpy as np
 
-def generar_valor(dist, params):
-    if dist == "uniform":
-        return float(np.random.uniform(params["low"], params["high"]))
-    elif dist == "normal":
-        return float(np.random.normal(params["mu"], params["sigma"]))
-    elif dist == "fixed":
-        return float(params["value"]) if isinstance(params["value"], (int, float)) else params["value"]
-    elif dist == "discrete":
-        return float(np.random.choice(params["values"], p=params["probs"]))
-    elif dist == "trunc_normal":
-        return float(max(params.get("min", 0), np.random.normal(params["mu"], params["sigma"])))  # Paréntesis corregido aquí
-    else:
+DIRECTORIO_MODELOS = "./models"
+
+# Muestreo de cada distribución con un generador de NumPy (el módulo np.random o un np.random.Generator).
+# Con n=None se obtiene un solo valor; con un entero, un arreglo de n valores.
+DISTRIBUCIONES = {
+    "uniform": lambda generador, params, n: generador.uniform(params["low"], params["high"], n),
+    "normal": lambda generador, params, n: generador.normal(params["mu"], params["sigma"], n),
+    "fixed": lambda generador, params, n: params["value"] if n is None else np.full(n, params["value"], dtype=float),
+    "discrete": lambda generador, params, n: generador.choice(np.asarray(params["values"], dtype=float), size=n,
+                                                              p=params["probs"]),
+    "trunc_normal": lambda generador, params, n: np.maximum(params.get("min", 0),
+                                                            generador.normal(params["mu"], params["sigma"], n)),
+}
+
+def muestrear(dist, params, generador, n=None):
+    if dist not in DISTRIBUCIONES:
         raise ValueError(f"Distribución '{dist}' no soportada.")
+    return DISTRIBUCIONES[dist](generador, params, n)
+
+def generar_valor(dist, params):
+    valor = muestrear(dist, params, np.random)
+    # Un valor "fixed" no numérico se pasa tal cual a la fórmula
+    return float(valor) if isinstance(valor, (int, float, np.number)) else valor
 
 def generar_escenario(config):
     escenario = {}
@@ -21,4 +33,62 @@ def generar_escenario(config):
     return escenario
 
 def evaluar_formula(formula, variables):
-    return eval(formula, {}, variables)
\ No newline at end of file
+    return eval(formula, {}, variables)
+
+# función para cargar un modelo indicado por ruta o por nombre, sin interacción
+def cargar_modelo(modelo, directorio_modelos=DIRECTORIO_MODELOS):
+    """
+    Carga un modelo a partir de una ruta a un archivo JSON o del nombre de un archivo
+    (con o sin extensión .json) dentro del directorio de modelos.
+    Lanza FileNotFoundError o json.JSONDecodeError si no se puede cargar.
+    """
+    candidatos = [modelo, os.path.join(directorio_modelos, modelo)]
+    if not modelo.endswith('.json'):
+        candidatos.append(os.path.join(directorio_modelos, modelo + '.json'))
+
+    for ruta in candidatos:
+        if os.path.isfile(ruta):
+            with open(ruta, "r") as f:
+                return json.load(f)
+    raise FileNotFoundError(f"No se encontró el modelo '{modelo}' (buscado en: {', '.join(candidatos)}).")
+
+# --- Versiones vectorizadas para la ejecución local por bloques ---
+def validar_modelo_vectorizado(config):
+    """
+    Verifica que todas las variables del modelo se puedan generar como arreglos numéricos.
+    Lanza ValueError con la variable problemática (distribución desconocida o valor "fixed" no numérico).
+    """
+    for var, dist_info in config["variables"].items():
+        dist = dist_info["dist"]
+        if dist not in DISTRIBUCIONES:
+            raise ValueError(f"La variable '{var}' usa la distribución '{dist}', que no está soportada.")
+        valor = dist_info["params"].get("value")
+        if dist == "fixed" and (isinstance(valor, bool) or not isinstance(valor, (int, float))):
+            raise ValueError(f"La variable '{var}' tiene un valor fijo no numérico ({valor!r}); "
+                             "la ejecución vectorizada sólo admite valores numéricos.")
+
+def generar_valores(dist, params, n, rng):
+    """
+    Genera `n` valores de la distribución indicada con el generador `rng` (np.random.Generator).
+    Usa las mismas distribuciones y parámetros que generar_valor.
+    """
+    return muestrear(dist, params, rng, n)
+
+def generar_escenarios(config, n, rng):
+    """Genera `n` escenarios como un diccionario {variable: arreglo de n valores}."""
+    return {var: generar_valores(dist_info["dist"], dist_info["params"], n, rng)
+            for var, dist_info in config["variables"].items()}
+
+def evaluar_formula_vectorizada(formula, escenarios, n):
+    """
+    Evalúa la fórmula sobre arreglos completos. Si la fórmula no admite arreglos
+    (p. ej. usa funciones escalares), se evalúa escenario por escenario.
+    """
+    try:
+        resultado = np.broadcast_to(np.asarray(evaluar_formula(formula, escenarios), dtype=float), (n,))
+    except (TypeError, ValueError):
+        resultado = np.fromiter(
+            (evaluar_formula(formula, {var: valores[i] for var, valores in escenarios.items()}) for i in range(n)),
+            dtype=float, count=n
+        )
+    return resultado
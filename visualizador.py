@@ -1,138 +1,209 @@
+''''
+    Visualizador de Resultados con Matplotlib
+
+    Este script consume los resultados de la simulación desde RabbitMQ y muestra un histograma
+    que se actualiza en tiempo real.
+    ------------------------------------------------
+        * El consumo de mensajes corre en un hilo separado y sólo acumula conteos en un
+          histograma incremental de bins fijos (costo constante por mensaje).
+        * El hilo principal redibuja a una tasa de cuadros limitada, actualizando únicamente
+          la altura de las barras mediante blitting, sin reconstruir los ejes.
+        * Así, la velocidad de consumo no depende del costo de dibujar.
+    ------------------------------------------------
+'''
+
 import pika
-import json
+import argparse
 import matplotlib.pyplot as plt
+import numpy as np
+import threading
 import time
 import os
 
-# Constantes para RabbitMQ (deben coincidir con el consumidor)
-RABBITMQ_HOST = 'localhost'
-EXCHANGE_NAME = 'simulacion_exchange' # Mismo exchange que usa el productor y consumidor
+# Constantes para RabbitMQ (deben coincidir con el consumidor) y capa de transporte
+from conexion import RABBITMQ_HOST, EXCHANGE_NAME, RESULTADOS_QUEUE_NAME, RESULTADOS_ROUTING_KEY
+from transporte import crear_transporte, agregar_argumentos_transporte, NOMBRE_MEMORIA, DESTINO_COLA
+from estadisticas import HistogramaIncremental
 
-# Cola y routing key para el visualizador
-RESULTADOS_QUEUE_NAME = 'resultados_queue'
-RESULTADOS_ROUTING_KEY = 'resultado.procesado' # Routing key para los mensajes de resultados
+NUM_BINS = 30 # Número fijo de bins del histograma (debe ser par para poder ampliar el rango)
+MUESTRAS_INICIALES = 100 # Muestras usadas para fijar el rango inicial de los bins
+FPS_MAXIMO = 10 # Tasa máxima de cuadros por segundo del render
 
-# Lista global para almacenar los resultados recibidos
-resultados_simulacion = []
-fig, ax = plt.subplots() # Crear figura y ejes una sola vez
-plt.ion() # Activar modo interactivo de matplotlib
 
-def actualizar_histograma():
-    """
-    Limpia y redibuja el histograma con los resultados actuales.
-    """
-    ax.clear() # Limpiar los ejes anteriores
-    if resultados_simulacion:
-        ax.hist(resultados_simulacion, bins=30, color='skyblue', alpha=0.7, edgecolor='black')
-    ax.set_title(f"Histograma de Resultados ({len(resultados_simulacion)} muestras)")
-    ax.set_xlabel("Valor del Resultado")
-    ax.set_ylabel("Frecuencia")
-    plt.tight_layout() # Ajustar layout para que no se corten los títulos
-    plt.draw() # Redibujar la figura
-    plt.pause(0.01) # Pausa breve para permitir que la GUI se actualice
+# Histograma global alimentado por el hilo consumidor
+histograma = HistogramaIncremental(NUM_BINS, MUESTRAS_INICIALES)
+silencioso = False # Si es True no se imprime cada resultado recibido
+
 
-def callback_visualizador(ch, method, properties, body):
+def procesar_resultado(mensaje_recibido):
     """
     Función que se ejecuta cuando se recibe un mensaje de resultado.
-    Decodifica el mensaje, extrae el resultado, lo añade a la lista
-    y actualiza el histograma periódicamente.
+    Extrae el resultado y lo acumula en el histograma incremental.
+    El dibujo ocurre en el hilo principal, por lo que aquí no se bloquea el consumo.
     """
-    global resultados_simulacion
     pid = os.getpid() # debugging flag(múltiples visualizadores)
+    id_escenario = mensaje_recibido.get("id_escenario", "ID_DESCONOCIDO")
+    valor_calculado = mensaje_recibido.get("valor_calculado")
 
-    try:
-        mensaje_recibido = json.loads(body.decode())
-        id_escenario = mensaje_recibido.get("id_escenario", "ID_DESCONOCIDO")
-        valor_calculado = mensaje_recibido.get("valor_calculado")
-
-        if valor_calculado is not None:
+    if valor_calculado is not None:
+        if not silencioso:
             print(f" [V:{pid}] Resultado Recibido - Escenario ID: {id_escenario}, Valor: {valor_calculado:.2f}")
-            resultados_simulacion.append(valor_calculado)
-
-            # Actualizar el histograma cada N resultados para no sobrecargar
-            if len(resultados_simulacion) % 10 == 0 or len(resultados_simulacion) == 1:
-                actualizar_histograma()
-        else:
-            print(f" [V:{pid}] Mensaje recibido no contenía 'valor_calculado': {mensaje_recibido}")
-
-        # Enviar ACK para el mensaje de resultado
-        # Esto es importante para confirmar que el mensaje fue procesado correctamente
-        # y evitar que se reenvíe en caso de error.
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-
-    except json.JSONDecodeError:
-        print(f" [V:{pid}] Error al decodificar JSON del resultado: {body.decode()}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False) # No reencolar mensajes malformados
-    except Exception as e:
-        print(f" [V:{pid}] Error procesando resultado (ID: {id_escenario if 'id_escenario' in locals() else 'N/A'}): {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        histograma.agregar(valor_calculado)
+    else:
+        print(f" [V:{pid}] Mensaje recibido no contenía 'valor_calculado': {mensaje_recibido}")
 
 
-def iniciar_visualizador():
+def consumir_resultados(transporte, tipo_transporte="amqp"):
     """
-    Establece conexión con RabbitMQ, declara exchange, cola, binding
-    y comienza a consumir mensajes de resultados.
+    Hilo consumidor: conecta, consume los resultados y cierra la conexión al terminar.
+    Toda la interacción con el transporte ocurre en este hilo.
     """
     pid = os.getpid()
-    connection = None
-    print(f" [V:{pid}] Iniciando visualizador...")
-
     try:
-        # Ajuste de credenciales:
-        credentials = pika.PlainCredentials('guest', 'guest') # Credenciales por defecto de RabbitMQ
-        connection_parameters = pika.ConnectionParameters(
-            host=RABBITMQ_HOST,
-            credentials=credentials
-        )
-
-        connection = pika.BlockingConnection(connection_parameters)
-        channel = connection.channel()
-
-        # Declarar el exchange (idempotente, debe coincidir con productor/consumidor)
-        channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='direct', durable=True)
-
-        # Declarar la cola de resultados (durable)
-        channel.queue_declare(queue=RESULTADOS_QUEUE_NAME, durable=True)
-        
-        # Vincular la cola de resultados al exchange con la routing key de resultados
-        channel.queue_bind(
-            exchange=EXCHANGE_NAME,
-            queue=RESULTADOS_QUEUE_NAME,
-            routing_key=RESULTADOS_ROUTING_KEY
-        )
-
-        print(f" [V:{pid}] Visualizador conectado. Exchange '{EXCHANGE_NAME}', consumiendo de '{RESULTADOS_QUEUE_NAME}' (RK: '{RESULTADOS_ROUTING_KEY}').")
-
-        # Configurar el consumo de mensajes
-        channel.basic_consume(
-            queue=RESULTADOS_QUEUE_NAME,
-            on_message_callback=callback_visualizador
-        )
-
-        print(f" [V:{pid}] [*] Esperando resultados. La gráfica se actualizará periódicamente.")
-        print(f" [V:{pid}] Para salir presione CTRL+C en esta terminal.")
-        
-        # Mostrar la figura inicialmente vacía
-        actualizar_histograma() 
-        
-        channel.start_consuming() # Bucle
+        # Establecer conexión y declarar exchange, cola de resultados y binding (idempotente)
+        # o adjuntarse a la memoria compartida
+        transporte.conectar()
+        if tipo_transporte == "amqp":
+            print(f" [V:{pid}] Visualizador conectado. Exchange '{EXCHANGE_NAME}', consumiendo de '{RESULTADOS_QUEUE_NAME}' (RK: '{RESULTADOS_ROUTING_KEY}').")
+
+        # Bucle de consumo; con AMQP se reanuda automáticamente tras una reconexión
+        transporte.consumir_resultados(procesar_resultado, destino=DESTINO_COLA)
 
     except pika.exceptions.AMQPConnectionError as e:
         print(f" [V:{pid}] Error de conexión con RabbitMQ (Visualizador): {e}")
         print(f" [V:{pid}] Asegúrate de que RabbitMQ esté corriendo en {RABBITMQ_HOST} y accesible.")
         print(f" [V:{pid}] Si usas Docker, verifica que el contenedor esté activo y los puertos mapeados.")
-        time.sleep(5)
+    except FileNotFoundError as e:
+        print(f" [V:{pid}] {e}")
+    except Exception as e:
+        print(f" [V:{pid}] Ocurrió un error inesperado en el consumidor del visualizador: {e}")
+    finally:
+        transporte.cerrar()
+        print(f" [V:{pid}] Conexión del visualizador cerrada.")
+
+
+def bucle_renderizado(hilo_consumidor, fps=FPS_MAXIMO):
+    """
+    Redibuja el histograma a una tasa de cuadros limitada.
+
+    Las barras se crean una sola vez. En cada cuadro sólo se cambia su altura y se
+    dibujan sobre un fondo cacheado (blitting). El fondo completo sólo se vuelve a
+    dibujar cuando cambian los bordes de los bins o la escala del eje Y; además, el fondo
+    se vuelve a capturar en cada "draw_event", de modo que un redimensionamiento de la
+    ventana o un redibujado completo iniciado por el backend no dejan un fondo obsoleto.
+    """
+    fig, ax = plt.subplots() # Crear figura y ejes una sola vez
+    ax.set_title("Histograma de Resultados")
+    ax.set_xlabel("Valor del Resultado")
+    ax.set_ylabel("Frecuencia")
+
+    # Barras y texto animados: no se incluyen en el fondo cacheado
+    barras = ax.bar(np.arange(NUM_BINS), np.zeros(NUM_BINS), width=1.0, align='edge',
+                    color='skyblue', alpha=0.7, edgecolor='black', animated=True)
+    texto = ax.text(0.02, 0.95, "0 muestras", transform=ax.transAxes, va='top', animated=True)
+    artistas = list(barras) + [texto]
+
+    plt.tight_layout() # Ajustar layout para que no se corten los títulos
+    plt.show(block=False)
+    canvas = fig.canvas
+    usar_blit = getattr(canvas, "supports_blit", False)
+
+    fondo = None
+
+    def recapturar_fondo(evento):
+        # Patrón estándar de blitting: tras cada dibujo completo se captura el fondo y se
+        # vuelven a dibujar encima los artistas animados
+        nonlocal fondo
+        if usar_blit:
+            fondo = canvas.copy_from_bbox(fig.bbox)
+            for artista in artistas:
+                ax.draw_artist(artista)
+
+    canvas.mpl_connect("draw_event", recapturar_fondo)
+
+    version_dibujada = None
+    limite_y = 1
+    periodo = 1.0 / fps
+
+    while plt.fignum_exists(fig.number):
+        inicio = time.perf_counter()
+        bordes, conteos, total, version_rango = histograma.instantanea()
+
+        redibujar_fondo = fondo is None
+        if bordes is not None:
+            # Reubicar las barras sólo si cambiaron los bordes de los bins
+            if version_rango != version_dibujada:
+                for barra, izquierda, derecha in zip(barras, bordes[:-1], bordes[1:]):
+                    barra.set_x(izquierda)
+                    barra.set_width(derecha - izquierda)
+                ax.set_xlim(bordes[0], bordes[-1])
+                version_dibujada = version_rango
+                redibujar_fondo = True
+            # Ampliar el eje Y con holgura para no tener que redibujar el fondo en cada cuadro
+            if conteos.max() > limite_y:
+                limite_y = int(conteos.max() * 1.5) + 1
+                ax.set_ylim(0, limite_y)
+                redibujar_fondo = True
+            for barra, conteo in zip(barras, conteos):
+                barra.set_height(conteo)
+        texto.set_text(f"{total} muestras")
+
+        if redibujar_fondo or not usar_blit:
+            # Dibujo completo (ejes, ticks, etiquetas) sin los artistas animados;
+            # el fondo se captura en recapturar_fondo (draw_event)
+            canvas.draw()
+        if usar_blit:
+            canvas.restore_region(fondo)
+        for artista in artistas:
+            ax.draw_artist(artista)
+        if usar_blit:
+            canvas.blit(fig.bbox)
+        canvas.flush_events() # Procesar eventos de la GUI (redimensionar, cerrar, etc.)
+
+        if not hilo_consumidor.is_alive():
+            break
+        time.sleep(max(0.0, periodo - (time.perf_counter() - inicio)))
+
+    return fig
+
+
+def iniciar_visualizador(host=RABBITMQ_HOST, transporte="amqp", nombre_memoria=NOMBRE_MEMORIA, fps=FPS_MAXIMO):
+    """
+    Inicia el hilo consumidor de resultados y el bucle de renderizado en el hilo principal.
+    """
+    pid = os.getpid()
+    print(f" [V:{pid}] Iniciando visualizador...")
+
+    # El visualizador no publica, por lo que no necesita confirmaciones del broker
+    canal = crear_transporte(transporte, host=host, prefijo=f" [V:{pid}]", confirmar_publicaciones=False,
+                             nombre=nombre_memoria)
+    hilo_consumidor = threading.Thread(target=consumir_resultados, args=(canal, transporte), daemon=True)
+    hilo_consumidor.start()
+
+    print(f" [V:{pid}] [*] Esperando resultados. La gráfica se actualizará hasta {fps} veces por segundo.")
+    print(f" [V:{pid}] Para salir cierre la ventana o presione CTRL+C en esta terminal.")
+
+    fig = None
+    try:
+        fig = bucle_renderizado(hilo_consumidor, fps)
     except KeyboardInterrupt:
         print(f" [V:{pid}] Visualización interrumpida por el usuario.")
-    except Exception as e:
-        print(f" [V:{pid}] Ocurrió un error inesperado en el visualizador: {e}")
     finally:
-        if connection and connection.is_open:
-            connection.close()
-            print(f" [V:{pid}] Conexión del visualizador cerrada.")
-        plt.ioff()
-        plt.show()
+        # Detener el consumo desde este hilo y esperar a que el consumidor cierre su conexión
+        canal.detener()
+        hilo_consumidor.join(timeout=5)
+        if fig is not None and plt.fignum_exists(fig.number):
+            plt.show() # Dejar la última gráfica visible hasta que se cierre la ventana
         print(f" [V:{pid}] Visualizador finalizado.")
 
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Visualizador de resultados con matplotlib.")
+    agregar_argumentos_transporte(parser)
+    parser.add_argument("--fps", type=float, default=FPS_MAXIMO, help="Cuadros por segundo máximos del render.")
+    parser.add_argument("-q", "--silencioso", action="store_true", help="No imprimir cada resultado recibido.")
+    return parser
+
 if __name__ == '__main__':
-    iniciar_visualizador()
+    args = crear_parser().parse_args()
+    silencioso = args.silencioso
+    iniciar_visualizador(args.host, args.transporte, args.nombre_memoria, args.fps)